@@ -18,7 +18,9 @@ if query_params.get("api", ["0"])[0] == "1":
             titel_naam=data["naam"],
             titel_datums=data.get("datums"),
             ratio_mode="cover",
-            repeat_if_insufficient=True
+            repeat_if_insufficient=True,
+            voorbeeld=bool(data.get("preview")),
+            voorbeeld_dias=data.get("preview_slides")
         )
 
         st.json({
@@ -0,0 +1,161 @@
+# api/admission.py
+"""
+Geheugenbudget per proces met toelatingscontrole.
+
+Elke generatie schat vooraf haar geheugengebruik: een vaste basis (sjabloon,
+python-pptx-objectboom), de fotobytes tot de spill-drempel, de voorbereide
+uitsneden en het opgeslagen pakket tot de spill-drempel. Een nieuwe generatie
+mag alleen starten als die schatting nog binnen MEMORY_BUDGET_MB past; anders
+krijgt de aanroeper 429 met Retry-After. Asynchrone jobs wachten in hun worker
+tot er ruimte is. Eén generatie die in haar eentje groter is dan het budget
+mag draaien als er verder niets loopt.
+"""
+import logging
+import os
+import threading
+from typing import Callable, Optional, TypeVar
+
+from fastapi import HTTPException
+
+from scripts.metrics import Counter
+from scripts.schijfbuffer import SPILL_OUTPUT_BYTES, SPILL_PHOTO_BYTES
+
+MB = 1024 * 1024
+MEMORY_BUDGET_BYTES = int(os.getenv("MEMORY_BUDGET_MB", "1024")) * MB  # 0 = geen budget
+ADMISSION_RETRY_AFTER = int(os.getenv("ADMISSION_RETRY_AFTER", "10"))
+ESTIMATE_BASE_BYTES = int(os.getenv("ESTIMATE_BASE_MB", "48")) * MB
+ESTIMATE_PHOTO_BYTES = int(os.getenv("ESTIMATE_PHOTO_KB", "4096")) * 1024
+ESTIMATE_PREPARED_BYTES = int(os.getenv("ESTIMATE_PREPARED_KB", "512")) * 1024
+
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Generaties geweigerd omdat het geheugenbudget vol is")
+
+T = TypeVar("T")
+
+
+def estimate_bytes(photos: int, photo_bytes: Optional[int] = None, decks: int = 1) -> int:
+    """Geschat piekgebruik van één generatie (`photos` foto's, samen `photo_bytes` als bekend)."""
+    if photo_bytes is None:
+        photo_bytes = photos * ESTIMATE_PHOTO_BYTES
+    prepared = photos * ESTIMATE_PREPARED_BYTES
+    per_deck = ESTIMATE_BASE_BYTES + prepared + min(prepared, SPILL_OUTPUT_BYTES)
+    return min(photo_bytes, SPILL_PHOTO_BYTES) + decks * per_deck
+
+
+def estimate_upload_bytes(content_length: int) -> int:
+    """Schatting voor een multipart-upload: de body bestaat vrijwel alleen uit foto's."""
+    return estimate_bytes(max(1, content_length // ESTIMATE_PHOTO_BYTES), photo_bytes=content_length)
+
+
+class Reservation:
+    """Een toegelaten generatie; geeft haar deel van het budget precies één keer terug."""
+
+    def __init__(self, budget: "MemoryBudget", size: int):
+        self._budget = budget
+        self.size = size
+        self._released = False
+
+    def release(self) -> None:
+        if not self._released:
+            self._released = True
+            self._budget._release(self.size)
+
+    def resize(self, size: int) -> bool:
+        """
+        Pas de reservering aan een betere schatting aan. Past de groei niet, dan wordt de
+        reservering in dezelfde stap vrijgegeven (False), zodat een ander request dat ook
+        wil groeien de ruimte wel krijgt.
+        """
+        return self._budget._resize(self, size)
+
+    def __enter__(self) -> "Reservation":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class MemoryBudget:
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_use = 0
+        self.active = 0
+        self._cond = threading.Condition()
+
+    def _fits(self, size: int) -> bool:
+        return self.limit <= 0 or self.active == 0 or self.in_use + size <= self.limit
+
+    def _take(self, size: int) -> Reservation:
+        self.in_use += size
+        self.active += 1
+        return Reservation(self, size)
+
+    def _release(self, size: int) -> None:
+        with self._cond:
+            self.in_use -= size
+            self.active -= 1
+            self._cond.notify_all()
+
+    def _resize(self, reservation: Reservation, size: int) -> bool:
+        with self._cond:
+            delta = size - reservation.size
+            # Zelf al actief: alleen kijken of de groei er nog bij past
+            if delta > 0 and not (self.limit <= 0 or self.active == 1 or self.in_use + delta <= self.limit):
+                if not reservation._released:
+                    reservation._released = True
+                    self.in_use -= reservation.size
+                    self.active -= 1
+                    self._cond.notify_all()
+                return False
+            self.in_use += delta
+            reservation.size = size
+            if delta < 0:
+                self._cond.notify_all()
+            return True
+
+    def try_reserve(self, size: int) -> Optional[Reservation]:
+        with self._cond:
+            return self._take(size) if self._fits(size) else None
+
+    def reserve_blocking(self, size: int) -> Reservation:
+        with self._cond:
+            self._cond.wait_for(lambda: self._fits(size))
+            return self._take(size)
+
+
+_budget = MemoryBudget(MEMORY_BUDGET_BYTES)
+
+
+def _reject(estimate: int) -> HTTPException:
+    ADMISSION_REJECTED.inc()
+    logging.error(
+        f"❌ Geheugenbudget vol: {_budget.in_use // MB} MB in gebruik, {estimate // MB} MB nodig"
+        f" (budget {_budget.limit // MB} MB)"
+    )
+    return HTTPException(
+        status_code=429,
+        detail="Server is druk, probeer het later opnieuw",
+        headers={"Retry-After": str(ADMISSION_RETRY_AFTER)},
+    )
+
+
+def admit(estimate: int) -> Reservation:
+    """Reserveer geheugen voor een generatie of weiger met 429 + Retry-After."""
+    reservation = _budget.try_reserve(estimate)
+    if reservation is None:
+        raise _reject(estimate)
+    return reservation
+
+
+def readmit(reservation: Reservation, estimate: int) -> None:
+    """Zet een reservering op een nieuwe schatting (bijv. na het ontvangen); 429 (en vrijgegeven) als die niet past."""
+    if not reservation.resize(estimate):
+        raise _reject(estimate - reservation.size)
+
+
+def admitted_job(estimate: int, fn: Callable[[], T]) -> Callable[[], T]:
+    """Voor asynchrone jobs: wacht in de worker tot het budget ruimte heeft."""
+    def _run() -> T:
+        with _budget.reserve_blocking(estimate):
+            return fn()
+    return _run
+
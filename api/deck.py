@@ -0,0 +1,213 @@
+# api/deck.py
+"""
+Bouwstenen voor het vullen van een sjabloon met foto's, gedeeld door de
+endpoints in api/main.py: sjabloon laden, foto's ophalen, plannen welke foto in
+welke placeholder komt, voorbereiden (procespool) en invoegen + opslaan.
+"""
+import logging
+from io import BytesIO
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+from fastapi import HTTPException
+
+from api.template_cache import get_template
+from scripts.beeldverwerking import FotoMemo, FotoTaak
+from scripts.foto_download import download_fotos
+from scripts.maak_presentatie import (
+    GecompileerdSjabloon,
+    beperk_dias,
+    laad_gecompileerd_sjabloon,
+    kloon_presentatie,
+    zoek_placeholders,
+)
+from scripts.ooxml_schrijver import sla_pakket_op
+from scripts.opslag import Opslag
+from scripts.schijfbuffer import FotoBuffer, GespildeFoto, UitvoerBuffer
+from scripts.metrics import DECK_BYTES_OUT, DECKS_TOTAL, PHOTOS_FAILED, stap
+
+DEFAULT_TEMPLATE = "SjabloonRustig.pptx"
+MIN_BYTES_PER_FOTO = 20 * 1024
+
+
+class DeckPlan(NamedTuple):
+    """Een gekloonde presentatie plus welke foto in welke placeholder komt."""
+    sjabloon: GecompileerdSjabloon
+    prs: object
+    plan: List[Tuple[object, str]]
+    taken: List[FotoTaak]
+
+
+def load_template(template_file: Optional[str], opslag: Opslag) -> GecompileerdSjabloon:
+    """Haal het (gecompileerde) sjabloon uit de cache; 404 als het niet bestaat."""
+    template_file = template_file or DEFAULT_TEMPLATE
+    with stap("sjabloon"):
+        try:
+            local_template, template_generation = get_template(template_file, opslag)
+        except FileNotFoundError as e:
+            raise HTTPException(status_code=404, detail=str(e))
+        logging.debug(f"📄 Sjabloon {template_file} (generation {template_generation}) uit cache")
+        return laad_gecompileerd_sjabloon(local_template, sleutel=template_file, versie=template_generation)
+
+
+def fetch_photos(urls: List[str]) -> Tuple[Dict[str, Optional[Union[bytes, GespildeFoto]]], List[str]]:
+    """
+    Download alle unieke foto's gelijktijdig; geeft de data en de bruikbare URL's in volgorde.
+    Boven SPILL_PHOTO_BYTES per request gaan de foto's direct vanuit de downloadthread naar schijf.
+    """
+    buffer = FotoBuffer()
+    with stap("download"):
+        foto_data = download_fotos(list(urls), verwerk=buffer.bewaar)
+    if buffer.gespild:
+        logging.debug(f"💾 {buffer.gespild} foto's naar schijf (boven {buffer.drempel} bytes in het geheugen)")
+    fotos = [url for url in urls if foto_data.get(url)]
+    mislukt = len(urls) - len(fotos)
+    if mislukt:
+        logging.error(f"❌ {mislukt} foto('s) konden niet worden gedownload")
+    return foto_data, fotos
+
+
+def photo_budget(sjabloon: GecompileerdSjabloon, max_output_bytes: Optional[int], placeholders: int) -> Optional[int]:
+    """Optioneel totaalbudget omrekenen naar een budget per placeholder."""
+    if not max_output_bytes or not placeholders:
+        return None
+    beschikbaar = max_output_bytes - len(sjabloon.blob)
+    return max(MIN_BYTES_PER_FOTO, beschikbaar // placeholders)
+
+
+def plan_deck(
+    sjabloon: GecompileerdSjabloon,
+    foto_data: Dict[str, Optional[bytes]],
+    fotos: List[str],
+    target_dpi: Optional[int] = None,
+    max_output_bytes: Optional[int] = None,
+    quality: Optional[int] = None,
+    max_slides: Optional[int] = None,
+) -> DeckPlan:
+    """
+    Kloon het sjabloon en verdeel de foto's (met herhaling) over de PICTURE-placeholders.
+    Met max_slides blijven alleen de eerste dia's over (voorbeeldweergave).
+    """
+    prs = kloon_presentatie(sjabloon)
+    manifest = sjabloon.picture_placeholders
+    if max_slides is not None:
+        manifest = tuple(info for info in manifest if info.slide_index < max_slides)
+        beperk_dias(prs, max_slides)
+    placeholders = zoek_placeholders(prs, manifest)
+
+    max_bytes_per_foto = photo_budget(sjabloon, max_output_bytes, len(placeholders))
+
+    plan = []
+    if fotos:
+        for i, (_slide, placeholder) in enumerate(placeholders):
+            plan.append((placeholder, fotos[i % len(fotos)]))
+
+    taken = [
+        FotoTaak(
+            foto_data[url],
+            placeholder.width,
+            placeholder.height,
+            dpi=target_dpi,
+            kwaliteit=quality,
+            max_bytes=max_bytes_per_foto,
+        )
+        for placeholder, url in plan
+    ]
+    return DeckPlan(sjabloon, prs, plan, taken)
+
+
+def insert_photos(deck: DeckPlan, voorbereid: List[Optional[Tuple[bytes, str]]]) -> None:
+    """Voeg de voorbereide foto's in hun placeholders in."""
+    with stap("invoegen"):
+        for (placeholder, url), resultaat in zip(deck.plan, voorbereid):
+            if resultaat is None:
+                logging.error(f"❌ Foto kon niet worden verwerkt: {url}")
+                PHOTOS_FAILED.inc(reason="verwerking")
+                continue
+            try:
+                placeholder.insert_picture(BytesIO(resultaat[0]))
+            except Exception as e:
+                logging.error(f"❌ Foto kon niet worden geplaatst: {e}")
+                PHOTOS_FAILED.inc(reason="plaatsen")
+                continue
+
+
+def save_deck(deck: DeckPlan, bestand) -> int:
+    """Schrijf het gevulde deck naar `bestand` (ook een DeckStream); geeft het aantal bytes."""
+    with stap("opslaan"):
+        start = bestand.tell()
+        # ✅ Ongewijzigde sjabloononderdelen ruw kopiëren, JPEG's zonder deflate
+        sla_pakket_op(deck.prs, bestand, deck.sjabloon.blob, deck.sjabloon.zip_index)
+        grootte = bestand.tell() - start
+    DECK_BYTES_OUT.inc(grootte)
+    DECKS_TOTAL.inc()
+    return grootte
+
+
+def fill_deck(deck: DeckPlan, voorbereid: List[Optional[Tuple[bytes, str]]]) -> UitvoerBuffer:
+    """Voeg de voorbereide foto's in en geef het opgeslagen .pptx-bestand (boven SPILL_OUTPUT_BYTES op schijf)."""
+    insert_photos(deck, voorbereid)
+    buf = UitvoerBuffer()
+    save_deck(deck, buf)
+    return buf
+
+
+def build_deck(
+    sjabloon: GecompileerdSjabloon,
+    foto_data: Dict[str, Optional[bytes]],
+    fotos: List[str],
+    memo: Optional[FotoMemo] = None,
+    target_dpi: Optional[int] = None,
+    max_output_bytes: Optional[int] = None,
+) -> UitvoerBuffer:
+    """Plan, bereid voor en vul één deck."""
+    memo = memo or FotoMemo()
+    deck = plan_deck(sjabloon, foto_data, fotos, target_dpi, max_output_bytes)
+    # ✅ Decode/crop/encode als aparte stap (procespool bij grotere decks)
+    with stap("voorbereiden"):
+        voorbereid = memo.bereid_voor(deck.taken)
+    logging.debug(f"🖼️ {memo.verwerkt} foto's verwerkt, {memo.hergebruikt} keer hergebruikt")
+    return fill_deck(deck, voorbereid)
+
+
+def deck_blob_path(collection: str, filename: str, fingerprint: Optional[str] = None) -> str:
+    """Objectnaam voor een deck: afgeleid van de vingerafdruk (resultaatcache) of uniek."""
+    if fingerprint:
+        return f"{collection}/{fingerprint[:16]}_{filename}"
+    import uuid
+    return f"{collection}/{uuid.uuid4().hex[:8]}_{filename}"
+
+
+def upload_deck(
+    opslag: Opslag,
+    bucket: str,
+    collection: str,
+    filename: str,
+    data: Union[bytes, UitvoerBuffer],
+    blob_path: Optional[str] = None,
+) -> str:
+    """Upload onder een unieke naam (of de opgegeven objectnaam) en geef de downloadlink."""
+    blob_path = blob_path or deck_blob_path(collection, filename)
+
+    with stap("upload"):
+        if isinstance(data, UitvoerBuffer):
+            with data:
+                if data.op_schijf:
+                    data.flush()
+                    opslag.upload_bestand(bucket, blob_path, data.pad)
+                else:
+                    opslag.upload_bytes(bucket, blob_path, data.getvalue())
+        else:
+            opslag.upload_bytes(bucket, blob_path, data)
+        url = opslag.download_url(bucket, blob_path)
+    logging.debug(f"✅ Downloadlink: {url}")
+    return url
+
+
+def upload_profile(opslag: Opslag, bucket: str, collection: str, filename: str, data: bytes) -> str:
+    """Upload een pstats-dump naast de presentaties van deze collectie."""
+    import uuid
+    blob_path = f"{collection}/{uuid.uuid4().hex[:8]}_{filename}.prof"
+    opslag.upload_bytes(bucket, blob_path, data, content_type="application/octet-stream")
+    url = opslag.download_url(bucket, blob_path)
+    logging.debug(f"⏱️ Profiel: {url}")
+    return url
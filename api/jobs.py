@@ -0,0 +1,119 @@
+# api/jobs.py
+"""
+Asynchrone jobs: een POST zet het werk in de wachtrij en geeft direct een job-id
+terug; een begrensde pool van workers bouwt de presentatie. De status (en de
+downloadlink) is op te vragen via GET /v1/jobs/{job_id}; optioneel wordt een
+callback-URL aangeroepen zodra de job klaar is.
+"""
+import os
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import APIRouter, HTTPException
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.getenv("JOB_QUEUE_MAX", "50"))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+
+router = APIRouter(prefix="/v1")
+
+
+class Job:
+    def __init__(self, callback_url: Optional[str] = None):
+        self.id = uuid.uuid4().hex
+        self.status = "queued"
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.callback_url = callback_url
+
+    def as_dict(self) -> Dict[str, Any]:
+        d: Dict[str, Any] = {
+            "job_id": self.id,
+            "status": self.status,
+            "status_url": f"/v1/jobs/{self.id}",
+        }
+        if self.result:
+            # Velden van het resultaat (download_url, ...) ernaast, zonder job_id/status/status_url te overschrijven
+            d.update((k, v) for k, v in self.result.items() if k not in d)
+        if self.error:
+            d["error"] = self.error
+        return d
+
+
+_lock = threading.Lock()
+_jobs: Dict[str, Job] = {}
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="deck-job")
+        return _executor
+
+
+def _opruimen() -> None:
+    grens = time.time() - JOB_TTL_SECONDS
+    with _lock:
+        for job_id in [j.id for j in _jobs.values() if j.finished_at and j.finished_at < grens]:
+            del _jobs[job_id]
+
+
+def _callback(job: Job) -> None:
+    import requests  # pas bij de eerste callback laden (koude start)
+    try:
+        requests.post(job.callback_url, json=job.as_dict(), timeout=10)
+    except requests.RequestException as e:
+        logging.error(f"❌ Callback voor job {job.id} mislukt: {e}")
+
+
+def _run(job: Job, fn: Callable[[], Dict[str, Any]]) -> None:
+    job.status = "running"
+    try:
+        job.result = fn()
+        job.status = "done"
+    except HTTPException as e:
+        job.error = str(e.detail)
+        job.status = "failed"
+    except Exception as e:
+        logging.exception(f"❌ Job {job.id} mislukt")
+        job.error = str(e)
+        job.status = "failed"
+    finally:
+        job.finished_at = time.time()
+    if job.callback_url:
+        _callback(job)
+
+
+def submit_job(fn: Callable[[], Dict[str, Any]], callback_url: Optional[str] = None) -> Job:
+    """Zet een generatie in de wachtrij; 503 als de wachtrij vol is."""
+    _opruimen()
+    with _lock:
+        open_jobs = sum(1 for j in _jobs.values() if j.status in ("queued", "running"))
+        if open_jobs >= JOB_QUEUE_MAX:
+            raise HTTPException(503, "Wachtrij is vol, probeer het later opnieuw", headers={"Retry-After": "30"})
+        job = Job(callback_url)
+        _jobs[job.id] = job
+    _get_executor().submit(_run, job, fn)
+    logging.debug(f"📥 Job {job.id} in de wachtrij ({open_jobs + 1} open)")
+    return job
+
+
+def get_job(job_id: str) -> Optional[Job]:
+    with _lock:
+        return _jobs.get(job_id)
+
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(404, "Onbekende job")
+    return job.as_dict()
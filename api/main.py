@@ -1,18 +1,18 @@
-import re
 import os
 import logging
 import sys
 import traceback
 from dotenv import load_dotenv
 from fastapi.middleware.cors import CORSMiddleware
-from pptx.enum.shapes import PP_PLACEHOLDER
 
 os.environ["PYTHONUNBUFFERED"] = "1"
 load_dotenv()
 
 # ✅ Logging direct naar stderr
+LOG_LEVEL = getattr(logging, os.getenv("LOG_LEVEL", "DEBUG").upper(), logging.DEBUG)
+
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=LOG_LEVEL,
     format="%(asctime)s [%(levelname)s] %(message)s",
     handlers=[logging.StreamHandler(sys.stderr)],
     force=True
@@ -20,7 +20,7 @@ logging.basicConfig(
 
 # ✅ Uvicorn logs ook op debug zetten
 for logger_name in ["uvicorn", "uvicorn.error"]:
-    logging.getLogger(logger_name).setLevel(logging.DEBUG)
+    logging.getLogger(logger_name).setLevel(LOG_LEVEL)
 
 # ✅ Ongecatchte exceptions afdrukken
 def handle_exception(exc_type, exc_value, exc_traceback):
@@ -32,28 +32,45 @@ def handle_exception(exc_type, exc_value, exc_traceback):
 sys.excepthook = handle_exception
 
 from fastapi import FastAPI, HTTPException, Header
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from fastapi import Request, Response
+from starlette.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError, validator
 from typing import List, Optional
-from google.cloud import storage
-from scripts.maak_presentatie import maak_presentatie_automatisch
-from pydantic import BaseModel, validator
-import requests
-from io import BytesIO
-import hashlib
-from pptx import Presentation
-from pptx.util import Inches, Pt
-from pptx.enum.text import PP_ALIGN
-from pptx.dml.color import RGBColor
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+from scripts.opslag import PPTX_CONTENT_TYPE, get_opslag
+from api.jobs import router as jobs_router, submit_job
+from api.profiling import profile_requested
+from api.admission import admit, admitted_job, estimate_bytes, estimate_upload_bytes, readmit
+from api.streaming import stream_deck
+from api.template_cache import TEMPLATE_BUCKET
+from api.result_cache import RESULT_CACHE_ENABLED, coalesce, lookup, photo_digests, request_fingerprint
+from api.warmup import WARMUP_ENABLED, warm_up
+from scripts.metrics import meet_request, render_metrics, server_timing, stap
+from scripts.profilering import ProfielBezet, profileer
 from datetime import datetime
 
+# ⚡ python-pptx, Pillow en requests (via api.deck / api.upload) worden pas bij het
+# eerste request geladen, of vooraf door de warm-up (STARTUP_WARMUP=1)
+
 API_KEY = os.getenv("STREAMLIT_API_KEY")
-BUCKET_NAME = os.getenv("BUCKET_TEMPLATES")
+# Formuliervelden die de upload-endpoint niet accepteert
+UPLOAD_RESERVED_FIELDS = {"photos", "preview", "preview_slides"}
 
-logging.debug(f"✅ gestart met BUCKET_TEMPLATES = {BUCKET_NAME}")
+logging.debug(f"✅ gestart met BUCKET_TEMPLATES = {TEMPLATE_BUCKET}")
 logging.debug(f"✅ API_KEY loaded? {'✅' if API_KEY else '❌'}")
 
-app = FastAPI(title="Uitvaart Presentatie API ✅")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if WARMUP_ENABLED:
+        # In een thread: de event loop blijft vrij, uvicorn is pas ready als dit klaar is
+        await run_in_threadpool(warm_up)
+    yield
+
+
+app = FastAPI(title="Uitvaart Presentatie API ✅", lifespan=lifespan)
 
 # ✅ CORS toestaan (nodig voor Streamlit of externe clients)
 app.add_middleware(
@@ -63,6 +80,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.include_router(jobs_router)
 
 # ✅ BESTAANDE CLASS VOOR STREAMLIT ENDPOINT
 class GenRequest(BaseModel):
@@ -82,6 +100,53 @@ class GeneratePresentationRequest(BaseModel):
     output_bucket: str
     output_filename: str
     template_file: Optional[str] = None
+    target_dpi: Optional[int] = None
+    max_output_bytes: Optional[int] = None
+    async_job: bool = False
+    callback_url: Optional[str] = None
+    # ✅ Snelle voorbeeldweergave: lage resolutie, geen upload (optioneel alleen de eerste N dia's)
+    preview: bool = False
+    preview_slides: Optional[int] = None
+    # ✅ Het .pptx-bestand direct als response, in stukken terwijl het wordt geschreven;
+    # standaard zonder upload, met stream_upload ook een kopie in de opslag
+    stream: bool = False
+    stream_upload: bool = False
+
+    @validator("photos")
+    def photos_not_empty(cls, v):
+        if not isinstance(v, list) or len(v) == 0:
+            raise ValueError("Minimaal één foto verplicht")
+        return v
+
+    @validator("preview_slides")
+    def preview_slides_positive(cls, v):
+        if v is not None and v < 1:
+            raise ValueError("preview_slides moet minimaal 1 zijn")
+        return v
+
+    @validator("stream")
+    def stream_not_async(cls, v, values):
+        if v and values.get("async_job"):
+            raise ValueError("stream kan niet samen met async_job")
+        return v
+
+class OutputSpec(BaseModel):
+    template_file: str
+    output_filename: Optional[str] = None
+
+# ✅ EÉN FOTOSET, MEERDERE SJABLONEN
+class GenerateBatchRequest(BaseModel):
+    collection: str
+    title: Optional[str] = None
+    date_of_birth: Optional[str] = None
+    date_of_death: Optional[str] = None
+    photos: List[str]
+    output_bucket: str
+    outputs: List[OutputSpec]
+    target_dpi: Optional[int] = None
+    max_output_bytes: Optional[int] = None
+    async_job: bool = False
+    callback_url: Optional[str] = None
 
     @validator("photos")
     def photos_not_empty(cls, v):
@@ -89,6 +154,12 @@ class GeneratePresentationRequest(BaseModel):
             raise ValueError("Minimaal één foto verplicht")
         return v
 
+    @validator("outputs")
+    def outputs_not_empty(cls, v):
+        if not v:
+            raise ValueError("Minimaal één sjabloon verplicht")
+        return v
+
 @app.get("/")
 def root():
     return {"status": "✅ API actief", "service": "Presentatie generator"}
@@ -104,23 +175,39 @@ def _fmt_date(s: Optional[str]) -> Optional[str]:
     except Exception:
         return s
 
-@app.post("/v1/generate-presentation")
-def generate_presentation(req: GeneratePresentationRequest):
-    logging.debug(f"🚀 Base44 generate-presentation req: {req}")
+def _generate(req: GeneratePresentationRequest, profile: bool = False) -> dict:
+    """Bouw de presentatie uit het sjabloon, upload hem en geef de downloadlink (plus tijden per stap)."""
+    if profile:
+        # Een profiel van een cache-hit zegt niets: altijd bouwen
+        return _generate_profiled(req)
+    with meet_request() as tijden:
+        result = _generate_deck(req)
+    result["timings_ms"] = tijden.als_ms()
+    return result
 
-    template_file = req.template_file or "SjabloonRustig.pptx"
 
-    client = storage.Client()
-    sjabloon_bucket = client.bucket("warmeuitvaartassistent-sjablonen")
-    sjabloon_blob = sjabloon_bucket.blob(f"sjablonen/{template_file}")
-    local_template = f"/tmp/sjablonen/{template_file}"
-    os.makedirs("/tmp/sjablonen", exist_ok=True)
+def _generate_profiled(req: GeneratePresentationRequest) -> dict:
+    """Zelfde als _generate, maar onder cProfile; de dump komt naast de presentatie."""
+    try:
+        with profileer() as profiel, meet_request() as tijden:
+            result = _generate_deck(req, use_cache=False)
+    except ProfielBezet as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    result["timings_ms"] = tijden.als_ms()
+    from api.deck import upload_profile
+
+    result["profile_url"] = upload_profile(
+        get_opslag(), req.output_bucket, req.collection, req.output_filename, profiel.als_bytes()
+    )
+    result["profile_top"] = profiel.samenvatting()
+    return result
+
 
-    if os.path.exists(local_template):
-        os.remove(local_template)
+def _generate_deck(req: GeneratePresentationRequest, use_cache: bool = RESULT_CACHE_ENABLED) -> dict:
+    from api.deck import fetch_photos, load_template
 
-    sjabloon_blob.reload()
-    sjabloon_blob.download_to_filename(local_template)
+    opslag = get_opslag()
+    sjabloon = load_template(req.template_file, opslag)
 
     dob_fmt = _fmt_date(req.date_of_birth)
     dod_fmt = _fmt_date(req.date_of_death)
@@ -134,67 +221,369 @@ def generate_presentation(req: GeneratePresentationRequest):
     else:
         titel_datums = None
 
+    # ✅ Alle unieke foto's vooraf en gelijktijdig ophalen
+    foto_data, fotos = fetch_photos(req.photos)
+    return _deck_from_photos(req, opslag, sjabloon, foto_data, fotos, use_cache)
+
+
+def _deck_from_photos(
+    req: GeneratePresentationRequest,
+    opslag,
+    sjabloon,
+    foto_data,
+    fotos: List[str],
+    use_cache: bool = RESULT_CACHE_ENABLED,
+    memo=None,
+) -> dict:
+    """Bouw en upload het deck uit foto's die al binnen zijn (of geef het bestaande terug)."""
+    from api.deck import deck_blob_path
+
+    if not use_cache:
+        return {"download_url": _build_and_upload(req, opslag, sjabloon, foto_data, fotos, None, memo), "cached": False}
+
+    fingerprint = _fingerprint(req, sjabloon, foto_data, fotos)
+    blob_path = deck_blob_path(req.collection, req.output_filename, fingerprint)
+
+    def _lookup_or_build() -> dict:
+        url = lookup(opslag, req.output_bucket, blob_path)
+        if url:
+            logging.debug(f"♻️ Bestaande presentatie hergebruikt: {blob_path}")
+            return {"download_url": url, "cached": True}
+        url = _build_and_upload(req, opslag, sjabloon, foto_data, fotos, blob_path, memo)
+        return {"download_url": url, "cached": False}
+
+    result, joined = coalesce(f"{req.output_bucket}/{blob_path}", _lookup_or_build)
+    return dict(result, cached=result["cached"] or joined)
+
+
+def _fingerprint(req, sjabloon, foto_data, fotos, template_file: Optional[str] = None) -> str:
+    from api.deck import DEFAULT_TEMPLATE
+
+    return request_fingerprint(
+        template_file or req.template_file or DEFAULT_TEMPLATE,
+        sjabloon.versie,
+        photo_digests(foto_data, fotos),
+        title=req.title,
+        date_of_birth=req.date_of_birth,
+        date_of_death=req.date_of_death,
+        target_dpi=req.target_dpi,
+        max_output_bytes=req.max_output_bytes,
+    )
+
+
+def _build_and_upload(req, opslag, sjabloon, foto_data, fotos, blob_path: Optional[str], memo=None) -> str:
+    from api.deck import build_deck, upload_deck
+
     try:
         logging.debug("🎬 PPT genereren gestart met sjabloon...")
+        data = build_deck(
+            sjabloon, foto_data, fotos,
+            memo=memo,
+            target_dpi=req.target_dpi,
+            max_output_bytes=req.max_output_bytes,
+        )
+
+    except Exception as e:
+        logging.exception("❌ Fout tijdens presentatie generatie")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return upload_deck(opslag, req.output_bucket, req.collection, req.output_filename, data, blob_path)
 
-        prs = Presentation(local_template)
-        fotos = list(req.photos)
-        foto_index = 0
-
-        for slide in prs.slides:
-            image_shapes = []
-            for sh in slide.shapes:
-                try:
-                    if sh.is_placeholder and sh.placeholder_format.type == PP_PLACEHOLDER.PICTURE:
-                        image_shapes.append(sh)
-                except Exception:
-                    continue
-
-            def _ph_order_key(sh):
-                name = getattr(sh, "name", "") or ""
-                m = re.search(r"foto\s*0*(\d+)", name, re.IGNORECASE)
-                if m:
-                    return (0, int(m.group(1)))
-                return (1, int(sh.top), int(sh.left))
-
-            image_shapes.sort(key=_ph_order_key)
-
-            if not image_shapes:
-                continue
-
-            for placeholder in image_shapes:
-                if foto_index >= len(fotos):
-                    foto_index = 0
-                try:
-                    img_data = requests.get(fotos[foto_index]).content
-                    placeholder.insert_picture(BytesIO(img_data))
-                    foto_index += 1
-                except Exception as e:
-                    logging.error(f"❌ Foto kon niet worden geplaatst: {e}")
-                    continue
-
-        buf = BytesIO()
-        prs.save(buf)
-        data = buf.getvalue()
-        buf.close()
 
+def _generate_preview(req: GeneratePresentationRequest) -> bytes:
+    """
+    Voorbeeld met dezelfde vullogica als de echte presentatie, maar op miniatuurresolutie
+    en zonder upload; alleen de foto's die in de (eerste N) dia's passen worden opgehaald.
+    """
+    from api.deck import fetch_photos, fill_deck, load_template, plan_deck
+    from scripts.beeldverwerking import VOORBEELD_DPI, VOORBEELD_KWALITEIT, FotoMemo
+
+    opslag = get_opslag()
+    sjabloon = load_template(req.template_file, opslag)
+    placeholders = [
+        info for info in sjabloon.picture_placeholders
+        if req.preview_slides is None or info.slide_index < req.preview_slides
+    ]
+    try:
+        foto_data, fotos = fetch_photos(req.photos[:max(1, len(placeholders))])
+        deck = plan_deck(
+            sjabloon, foto_data, fotos,
+            # Nooit scherper dan de voorbeeldresolutie, ook niet als de client zijn gewone target_dpi meestuurt
+            target_dpi=min(req.target_dpi or VOORBEELD_DPI, VOORBEELD_DPI),
+            quality=VOORBEELD_KWALITEIT,
+            max_slides=req.preview_slides,
+        )
+        with stap("voorbereiden"):
+            voorbereid = FotoMemo().bereid_voor(deck.taken)
+        with fill_deck(deck, voorbereid) as buf:
+            return buf.getvalue()
+    except Exception as e:
+        logging.exception("❌ Fout tijdens voorbeeldweergave")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _generate_stream(req: GeneratePresentationRequest, reservation) -> StreamingResponse:
+    from api.deck import fetch_photos, load_template
+
+    opslag = get_opslag()
+    with meet_request() as tijden:
+        sjabloon = load_template(req.template_file, opslag)
+        foto_data, fotos = fetch_photos(req.photos)
+        response = _stream_from_photos(req, opslag, sjabloon, foto_data, fotos, reservation=reservation)
+    response.headers["Server-Timing"] = server_timing(tijden.als_ms())
+    return response
+
+
+def _stream_from_photos(
+    req: GeneratePresentationRequest, opslag, sjabloon, foto_data, fotos: List[str], memo=None, reservation=None
+) -> StreamingResponse:
+    """
+    Vul het deck en stuur het terug terwijl het wordt geschreven. Alleen met
+    stream_upload gaat er ook een kopie naar de opslag (link in X-Download-Url).
+    De reservering in het geheugenbudget loopt door tot het laatste stuk is geschreven.
+    """
+    from api.deck import deck_blob_path, insert_photos, plan_deck, save_deck
+    from scripts.beeldverwerking import FotoMemo
+
+    try:
+        deck = plan_deck(sjabloon, foto_data, fotos, req.target_dpi, req.max_output_bytes)
+        with stap("voorbereiden"):
+            voorbereid = (memo or FotoMemo()).bereid_voor(deck.taken)
+        insert_photos(deck, voorbereid)
     except Exception as e:
         logging.exception("❌ Fout tijdens presentatie generatie")
         raise HTTPException(status_code=500, detail=str(e))
 
-    bucket = client.bucket(req.output_bucket)
+    headers = {"Content-Disposition": f'attachment; filename="{req.output_filename}"'}
+    upload = None
+    if req.stream_upload:
+        fingerprint = _fingerprint(req, sjabloon, foto_data, fotos) if RESULT_CACHE_ENABLED else None
+        blob_path = deck_blob_path(req.collection, req.output_filename, fingerprint)
+        headers["X-Download-Url"] = opslag.download_url(req.output_bucket, blob_path)
 
-    import uuid
-    unique_id = uuid.uuid4().hex[:8]
-    blob_path = f"{req.collection}/{unique_id}_{req.output_filename}"
+        def upload(pad: str) -> None:
+            with stap("upload"):
+                opslag.upload_bestand(req.output_bucket, blob_path, pad)
+            logging.debug(f"✅ Gestreamde presentatie opgeslagen: {blob_path}")
 
-    blob = bucket.blob(blob_path)
-    blob.upload_from_string(
-        data,
-        content_type="application/vnd.openxmlformats-officedocument.presentationml.presentation"
-    )
+    stream = stream_deck(lambda f: save_deck(deck, f), upload, done=reservation.release if reservation else None)
+    return StreamingResponse(stream, media_type=PPTX_CONTENT_TYPE, headers=headers)
+
+
+def _generate_batch(req: GenerateBatchRequest) -> dict:
+    """Eén fotoset, meerdere sjablonen: foto's één keer ophalen en decoderen, decks parallel bouwen."""
+    with meet_request() as tijden:
+        result = _generate_batch_decks(req)
+    result["timings_ms"] = tijden.als_ms()
+    return result
 
-    url = f"https://storage.googleapis.com/{req.output_bucket}/{blob_path}"
-    logging.debug(f"✅ Downloadlink: {url}")
 
-    return {"download_url": url}
\ No newline at end of file
+def _generate_batch_decks(req: GenerateBatchRequest) -> dict:
+    from api.deck import deck_blob_path, fetch_photos, fill_deck, load_template, plan_deck, upload_deck
+    from scripts.beeldverwerking import FotoMemo
+
+    opslag = get_opslag()
+    sjablonen = [load_template(spec.template_file, opslag) for spec in req.outputs]
+
+    try:
+        foto_data, fotos = fetch_photos(req.photos)
+
+        # ✅ Sjablonen waarvan dit resultaat al bestaat overslaan
+        results: List[Optional[dict]] = [None] * len(req.outputs)
+        blob_paths: List[Optional[str]] = [None] * len(req.outputs)
+        if RESULT_CACHE_ENABLED:
+            for i, (spec, sjabloon) in enumerate(zip(req.outputs, sjablonen)):
+                filename = spec.output_filename or spec.template_file
+                fingerprint = _fingerprint(req, sjabloon, foto_data, fotos, spec.template_file)
+                blob_paths[i] = deck_blob_path(req.collection, filename, fingerprint)
+                url = lookup(opslag, req.output_bucket, blob_paths[i])
+                if url:
+                    results[i] = {"template_file": spec.template_file, "download_url": url, "cached": True}
+        te_bouwen = [i for i, r in enumerate(results) if r is None]
+
+        # ✅ Alle uitsneden voor alle sjablonen in één stap: per foto één decode
+        decks = [
+            plan_deck(sjablonen[i], foto_data, fotos, req.target_dpi, req.max_output_bytes)
+            for i in te_bouwen
+        ]
+        memo = FotoMemo()
+        with stap("voorbereiden"):
+            voorbereid = memo.bereid_voor([taak for deck in decks for taak in deck.taken])
+        logging.debug(f"🖼️ {memo.verwerkt} foto's gedecodeerd voor {len(decks)} sjablonen")
+
+        per_deck = []
+        start = 0
+        for deck in decks:
+            per_deck.append(voorbereid[start:start + len(deck.taken)])
+            start += len(deck.taken)
+
+        def _bouw_en_upload(j: int) -> dict:
+            i = te_bouwen[j]
+            spec = req.outputs[i]
+            filename = spec.output_filename or spec.template_file
+
+            def _lookup_or_build() -> dict:
+                url = lookup(opslag, req.output_bucket, blob_paths[i]) if blob_paths[i] else None
+                if url:
+                    return {"template_file": spec.template_file, "download_url": url, "cached": True}
+                with fill_deck(decks[j], per_deck[j]) as data:
+                    url = upload_deck(opslag, req.output_bucket, req.collection, filename, data, blob_paths[i])
+                return {"template_file": spec.template_file, "download_url": url, "cached": False}
+
+            if blob_paths[i] is None:
+                return _lookup_or_build()
+            # Een identiek request dat dit sjabloon al bouwt: op dat resultaat wachten
+            result, joined = coalesce(f"{req.output_bucket}/{blob_paths[i]}", _lookup_or_build)
+            return dict(result, cached=result["cached"] or joined)
+
+        if decks:
+            # Elke thread krijgt de context mee, zodat de staptijden bij dit request terechtkomen
+            contexten = [contextvars.copy_context() for _ in decks]
+            with ThreadPoolExecutor(max_workers=len(decks), thread_name_prefix="deck-fanout") as pool:
+                gebouwd = pool.map(lambda j: contexten[j].run(_bouw_en_upload, j), range(len(decks)))
+                for i, result in zip(te_bouwen, gebouwd):
+                    results[i] = result
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.exception("❌ Fout tijdens presentatie generatie (batch)")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return {"results": results}
+
+@app.post("/v1/generate-presentation")
+def generate_presentation(
+    req: GeneratePresentationRequest,
+    response: Response,
+    x_profile: Optional[str] = Header(None),
+    x_api_key: Optional[str] = Header(None),
+):
+    logging.debug(f"🚀 Base44 generate-presentation req: {req}")
+    profile = profile_requested(x_profile, x_api_key)
+
+    estimate = estimate_bytes(len(req.photos))
+
+    if req.preview:
+        with admit(estimate), meet_request() as tijden:
+            data = _generate_preview(req)
+        return Response(
+            content=data,
+            media_type=PPTX_CONTENT_TYPE,
+            headers={
+                "Content-Disposition": f'inline; filename="preview_{req.output_filename}"',
+                "Server-Timing": server_timing(tijden.als_ms()),
+            },
+        )
+
+    if req.stream:
+        # Geen profiel in deze modus: dat hoort bij een opgeslagen presentatie
+        reservation = admit(estimate)
+        try:
+            return _generate_stream(req, reservation)
+        except BaseException:
+            reservation.release()
+            raise
+
+    if req.async_job:
+        job = submit_job(admitted_job(estimate, lambda: _generate(req, profile)), callback_url=req.callback_url)
+        return JSONResponse(status_code=202, content=job.as_dict())
+
+    with admit(estimate):
+        result = _generate(req, profile)
+    response.headers["Server-Timing"] = server_timing(result["timings_ms"])
+    return result
+
+
+@app.post("/v1/generate-presentation-upload")
+async def generate_presentation_upload(request: Request, response: Response):
+    """
+    Zelfde als /v1/generate-presentation, maar met de foto's als multipart-bestanden
+    (velden: collection, output_bucket, output_filename, ... vóór de foto's).
+    """
+    from api.upload import PhotoUpload
+
+    opslag = get_opslag()
+    upload = PhotoUpload(opslag)
+    # Toelating vóór het ontvangen, op basis van de grootte van de body (zonder Content-Length,
+    # bij chunked uploads, is dat een minimum; na het ontvangen volgt de echte schatting)
+    reservation = admit(estimate_upload_bytes(int(request.headers.get("content-length") or 0)))
+    handed_off = False
+
+    try:
+        with meet_request() as tijden:
+            with stap("ontvangen"):
+                await upload.receive(request)
+            logging.debug(f"🚀 Upload ontvangen: {len(upload.fotos)} foto's, {upload.total_bytes} bytes")
+            try:
+                readmit(reservation, estimate_bytes(len(upload.fotos), photo_bytes=upload.total_bytes))
+            except HTTPException:
+                await upload.prepared()
+                raise
+
+            # photos komen uit de bestanden; een voorbeeld gaat via /v1/generate-presentation
+            niet_toegestaan = sorted(set(upload.fields) & UPLOAD_RESERVED_FIELDS)
+            if niet_toegestaan:
+                await upload.prepared()
+                raise HTTPException(
+                    status_code=422,
+                    detail=f"Velden niet toegestaan bij een upload: {', '.join(niet_toegestaan)}",
+                )
+            try:
+                req = GeneratePresentationRequest(**upload.fields, photos=upload.fotos)
+            except ValidationError as e:
+                await upload.prepared()
+                raise HTTPException(status_code=422, detail=e.errors())
+            sjabloon = await upload.template()
+            with stap("voorbereiden"):
+                await upload.prepared()
+
+            def _run() -> dict:
+                return _deck_from_photos(req, opslag, sjabloon, upload.foto_data, upload.fotos, memo=upload.memo)
+
+            if req.stream:
+                streamed = await run_in_threadpool(
+                    _stream_from_photos, req, opslag, sjabloon, upload.foto_data, upload.fotos, upload.memo, reservation
+                )
+                handed_off = True
+                streamed.headers["Server-Timing"] = server_timing(tijden.als_ms())
+                return streamed
+
+            if req.async_job:
+                # De ontvangen foto's blijven tot het einde van de job gereserveerd
+                def _job() -> dict:
+                    with reservation:
+                        return _run()
+
+                job = submit_job(_job, callback_url=req.callback_url)
+                handed_off = True
+                return JSONResponse(status_code=202, content=job.as_dict())
+
+            result = await run_in_threadpool(_run)
+    finally:
+        if not handed_off:
+            reservation.release()
+    result["timings_ms"] = tijden.als_ms()
+    response.headers["Server-Timing"] = server_timing(result["timings_ms"])
+    return result
+
+
+@app.post("/v1/generate-presentations")
+def generate_presentations(req: GenerateBatchRequest, response: Response):
+    logging.debug(f"🚀 Base44 generate-presentations req: {req}")
+
+    estimate = estimate_bytes(len(req.photos), decks=len(req.outputs))
+
+    if req.async_job:
+        job = submit_job(admitted_job(estimate, lambda: _generate_batch(req)), callback_url=req.callback_url)
+        return JSONResponse(status_code=202, content=job.as_dict())
+
+    with admit(estimate):
+        result = _generate_batch(req)
+    response.headers["Server-Timing"] = server_timing(result["timings_ms"])
+    return result
+
+
+@app.get("/metrics")
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
@@ -5,12 +5,14 @@ from typing import List, Optional
 from io import BytesIO
 from datetime import datetime
 import hashlib
-import requests
 from pptx import Presentation
 from pptx.util import Inches, Pt
 from pptx.enum.text import PP_ALIGN
 from pptx.dml.color import RGBColor
-from google.cloud import storage
+from scripts.foto_download import download_fotos
+from scripts.fotodias import lees_afbeelding, voeg_fotodias_toe
+from scripts.opslag import get_opslag
+from scripts.ooxml_schrijver import sla_pakket_op
 
 router = APIRouter(prefix="/v1")
 
@@ -66,23 +68,17 @@ def _title_slide(prs: Presentation, title: Optional[str], dob: Optional[str], do
         p2.alignment = PP_ALIGN.CENTER
         p2.font.color.rgb = RGBColor(0x55, 0x55, 0x55)
 
-def _photo_slide(prs: Presentation, img_bytes: bytes):
-    slide = prs.slides.add_slide(prs.slide_layouts[6])
-    stream = BytesIO(img_bytes)
-    slide.shapes.add_picture(stream, Inches(0), Inches(0), width=Inches(10), height=Inches(7.5))
-
-def _download(url: str, timeout=20) -> bytes:
-    r = requests.get(url, timeout=timeout)
-    if r.status_code != 200:
-        raise HTTPException(502, f"Foto niet te downloaden ({r.status_code})")
-    return r.content
+def _photo_slides(prs: Presentation, urls: List[str]) -> int:
+    # Downloaden en inlezen gelijktijdig per foto; mislukte foto's vallen weg
+    images = download_fotos(urls, verwerk=lees_afbeelding)
+    ordered = [images[url] for url in urls if images.get(url) is not None]  # volgorde Base44 aanhouden (jouw keuze B)
+    # Alle dia's in één keer: kosten lineair in het aantal foto's
+    return voeg_fotodias_toe(prs, prs.slide_layouts[6], ordered, Inches(0), Inches(0), Inches(10), Inches(7.5))
 
 def _upload_gcs(bucket_name: str, blob_path: str, data: bytes, content_type="application/vnd.openxmlformats-officedocument.presentationml.presentation") -> str:
-    client = storage.Client()
-    bucket = client.bucket(bucket_name)
-    blob = bucket.blob(blob_path)
-    blob.upload_from_string(data, content_type=content_type)
-    return f"https://storage.googleapis.com/{bucket_name}/{blob_path}"
+    opslag = get_opslag()
+    opslag.upload_bytes(bucket_name, blob_path, data, content_type=content_type)
+    return opslag.download_url(bucket_name, blob_path)
 
 @router.post("/generate-presentation")
 def generate_presentation(req: GeneratePresentationRequest):
@@ -95,18 +91,11 @@ def generate_presentation(req: GeneratePresentationRequest):
         prs = Presentation()  # 16:9
         _title_slide(prs, req.title, req.date_of_birth, req.date_of_death)
 
-        for url in req.photos:  # volgorde Base44 aanhouden (jouw keuze B)
-            try:
-                img = _download(url)
-                _photo_slide(prs, img)
-            except HTTPException:
-                continue
-
-        if len(prs.slides) <= 1:
+        if _photo_slides(prs, req.photos) == 0:
             raise HTTPException(400, "Geen geldige foto’s gevonden om te plaatsen")
 
         buf = BytesIO()
-        prs.save(buf)
+        sla_pakket_op(prs, buf)  # foto's zonder deflate
         data = buf.getvalue()
         buf.close()
 
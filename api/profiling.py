@@ -0,0 +1,21 @@
+# api/profiling.py
+"""
+Opt-in profilering per request: met de header `X-Profile: 1` en de juiste
+`X-API-Key` (STREAMLIT_API_KEY) draait één request onder cProfile.
+"""
+import hmac
+import os
+from typing import Optional
+
+from fastapi import HTTPException
+
+API_KEY = os.getenv("STREAMLIT_API_KEY")
+
+
+def profile_requested(x_profile: Optional[str], x_api_key: Optional[str]) -> bool:
+    """True als er geprofileerd moet worden; 403 bij een ontbrekende of onjuiste sleutel."""
+    if not x_profile or x_profile.lower() in ("0", "false", "no"):
+        return False
+    if not API_KEY or not x_api_key or not hmac.compare_digest(x_api_key, API_KEY):
+        raise HTTPException(status_code=403, detail="Profileren vereist een geldige X-API-Key")
+    return True
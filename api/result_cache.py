@@ -0,0 +1,94 @@
+# api/result_cache.py
+"""
+Resultaatcache: identieke requests (zelfde sjabloonversie, foto's, titel en
+datums) krijgen de bestaande presentatie terug in plaats van een nieuwe build.
+
+De presentatie wordt opgeslagen onder een naam die van de vingerafdruk is
+afgeleid, dus de opslag zelf is de cache (gedeeld tussen instanties).
+Gelijktijdige identieke requests binnen één proces wachten op één build.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Callable, Dict, Iterable, Optional, Tuple, TypeVar
+
+from scripts.opslag import Opslag
+from scripts.schijfbuffer import foto_sha1
+
+RESULT_CACHE_ENABLED = os.getenv("RESULT_CACHE_ENABLED", "1").lower() not in ("0", "false", "no")
+
+T = TypeVar("T")
+
+
+def request_fingerprint(template_file: str, template_version, photo_digests: Iterable[str], **fields) -> str:
+    """Vingerafdruk van alles wat de uitkomst bepaalt; de volgorde van de foto's telt mee."""
+    payload = {
+        "template_file": template_file,
+        "template_version": str(template_version),
+        "photos": list(photo_digests),
+        **fields,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def photo_digests(foto_data: Dict[str, Optional[bytes]], fotos: Iterable[str]) -> list:
+    """sha1 van de gedownloade bytes (ook van foto's op schijf), in de volgorde van de bruikbare foto's."""
+    return [foto_sha1(foto_data[url]) for url in fotos]
+
+
+def lookup(opslag: Opslag, bucket: str, blob_path: str) -> Optional[str]:
+    """Downloadlink van een eerder gebouwde presentatie, of None."""
+    try:
+        if opslag.metadata(bucket, blob_path) is None:
+            return None
+    except Exception as e:
+        # Een haperende opslag mag de generatie niet blokkeren
+        logging.error(f"❌ Resultaatcache niet bereikbaar: {e}")
+        return None
+    return opslag.download_url(bucket, blob_path)
+
+
+# ---------------------------
+# Gelijktijdige identieke requests samenvoegen
+# ---------------------------
+
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+_inflight: Dict[str, _InFlight] = {}
+_inflight_lock = threading.Lock()
+
+
+def coalesce(key: str, fn: Callable[[], T]) -> Tuple[T, bool]:
+    """
+    Voer fn één keer uit per sleutel zolang hij loopt; wie tegelijk binnenkomt
+    krijgt hetzelfde resultaat (of dezelfde fout). Geeft (resultaat, meegelift).
+    """
+    with _inflight_lock:
+        entry = _inflight.get(key)
+        leader = entry is None
+        if leader:
+            entry = _inflight[key] = _InFlight()
+
+    if not leader:
+        entry.done.wait()
+        if entry.error is not None:
+            raise entry.error
+        return entry.result, True
+
+    try:
+        entry.result = fn()
+        return entry.result, False
+    except BaseException as e:
+        entry.error = e
+        raise
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+        entry.done.set()
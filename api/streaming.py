@@ -0,0 +1,134 @@
+# api/streaming.py
+"""
+Een deck rechtstreeks naar de client sturen terwijl het wordt geschreven.
+
+sla_pakket_op schrijft in een eigen thread naar een DeckStream; die geeft de
+bytes in stukken van STREAM_CHUNK_BYTES via een begrensde wachtrij door aan
+StreamingResponse. Er is geen BytesIO met het hele deck en geen getvalue()-kopie.
+Met upload gaat een kopie naar een tijdelijk bestand, dat na het laatste stuk
+naar de opslag gaat.
+"""
+import contextvars
+import logging
+import os
+import queue
+import tempfile
+import threading
+import time
+from typing import Callable, Iterator, Optional
+
+STREAM_CHUNK_BYTES = int(os.getenv("STREAM_CHUNK_BYTES", str(256 * 1024)))
+STREAM_QUEUE_CHUNKS = int(os.getenv("STREAM_QUEUE_CHUNKS", "8"))
+# Zo lang mag een client stilstaan voordat het schrijven wordt afgebroken
+STREAM_STALL_SECONDS = float(os.getenv("STREAM_STALL_SECONDS", "60"))
+
+_END = object()
+
+
+class DeckStream:
+    """Alleen-schrijven bestandsobject (write/tell) waarvan de client de bytes leest."""
+
+    def __init__(self, copy=None):
+        self._queue: queue.Queue = queue.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+        self._buffer = bytearray()
+        self._position = 0
+        self._copy = copy
+        self._gone = threading.Event()
+
+    def seekable(self) -> bool:
+        return False
+
+    def tell(self) -> int:
+        return self._position
+
+    def write(self, data) -> int:
+        self._position += len(data)
+        if self._copy is not None:
+            self._copy.write(data)
+        self._buffer += data
+        if len(self._buffer) >= STREAM_CHUNK_BYTES:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def _put(self, item) -> None:
+        deadline = time.monotonic() + STREAM_STALL_SECONDS
+        while not self._gone.is_set():
+            try:
+                self._queue.put(item, timeout=0.5)
+                return
+            except queue.Full:
+                if time.monotonic() > deadline:
+                    break
+        raise ConnectionAbortedError("Client leest de presentatie niet (meer)")
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        """Laatste stuk (of de fout) naar de client."""
+        if error is None and self._buffer:
+            self._put(bytes(self._buffer))
+            self._buffer.clear()
+        self._put(_END if error is None else error)
+
+    def __iter__(self) -> Iterator[bytes]:
+        # Sync iterator: Starlette leest hem in de threadpool
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _END:
+                    return
+                if isinstance(item, BaseException):
+                    # Headers zijn al verstuurd: de verbinding afbreken is het enige signaal
+                    raise item
+                yield item
+        finally:
+            self._gone.set()
+
+
+def stream_deck(
+    write: Callable[[object], int],
+    upload: Optional[Callable[[str], None]] = None,
+    done: Optional[Callable[[], None]] = None,
+) -> DeckStream:
+    """
+    Start write(bestand) in een eigen thread en geef de DeckStream om te versturen.
+    upload(pad) krijgt daarna het volledige bestand, zonder de client op te houden;
+    done() loopt altijd als laatste (bijv. om het geheugenbudget vrij te geven).
+    """
+    copy = tempfile.NamedTemporaryFile(suffix=".pptx", delete=False) if upload else None
+    stream = DeckStream(copy)
+
+    def _run() -> None:
+        try:
+            try:
+                write(stream)
+                stream.finish()
+            except ConnectionAbortedError as e:
+                logging.error(f"❌ {e}")
+                return
+            except Exception as e:
+                logging.exception("❌ Fout tijdens het streamen van de presentatie")
+                try:
+                    stream.finish(e)
+                except ConnectionAbortedError:
+                    pass
+                return
+            if copy is not None:
+                copy.close()
+                try:
+                    upload(copy.name)
+                except Exception as e:
+                    logging.error(f"❌ Upload van de gestreamde presentatie mislukt: {e}")
+        finally:
+            if copy is not None:
+                copy.close()
+                os.unlink(copy.name)
+            if done is not None:
+                done()
+
+    # Met de context van het request, zodat de stap "opslaan" bij dit request hoort
+    ctx = contextvars.copy_context()
+    threading.Thread(target=ctx.run, args=(_run,), name="deck-stream", daemon=True).start()
+    return stream
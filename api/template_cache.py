@@ -0,0 +1,112 @@
+# api/template_cache.py
+"""
+Lokale cache voor sjablonen uit de opslag (standaard GCS).
+
+Bestanden worden per (sjabloonnaam, GCS-generation) bewaard. Een goedkope
+metadata-check (of, binnen de TTL, helemaal geen check) bepaalt of er opnieuw
+gedownload moet worden. Downloads gaan naar een tijdelijk bestand dat atomair
+wordt hernoemd, zodat gelijktijdige requests nooit een half bestand lezen.
+"""
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from scripts.opslag import Opslag, get_opslag
+
+TEMPLATE_BUCKET = os.getenv("BUCKET_TEMPLATES") or "warmeuitvaartassistent-sjablonen"
+TEMPLATE_PREFIX = "sjablonen"
+CACHE_DIR = os.getenv("TEMPLATE_CACHE_DIR", "/tmp/sjablonen")
+CHECK_TTL = float(os.getenv("TEMPLATE_CACHE_TTL", "60"))
+MAX_BYTES = int(os.getenv("TEMPLATE_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+
+class CachedTemplate(NamedTuple):
+    path: str
+    generation: int
+    size: int
+    checked_at: float
+
+
+_lock = threading.Lock()
+_name_locks: Dict[str, threading.Lock] = {}
+_entries: Dict[str, CachedTemplate] = {}
+# LRU van alle bestanden op schijf: pad -> grootte
+_files: "OrderedDict[str, int]" = OrderedDict()
+
+
+def _lock_for(template_file: str) -> threading.Lock:
+    with _lock:
+        return _name_locks.setdefault(template_file, threading.Lock())
+
+
+def _local_path(template_file: str, generation: int) -> str:
+    stem, ext = os.path.splitext(os.path.basename(template_file))
+    return os.path.join(CACHE_DIR, f"{stem}.{generation}{ext}")
+
+
+def _touch(path: str, size: int) -> None:
+    with _lock:
+        _files[path] = size
+        _files.move_to_end(path)
+
+
+def _evict(keep: str) -> None:
+    """Verwijder de minst recent gebruikte bestanden tot de cache onder MAX_BYTES zit."""
+    with _lock:
+        total = sum(_files.values())
+        for path in list(_files):
+            if total <= MAX_BYTES:
+                break
+            if path == keep:
+                continue
+            total -= _files.pop(path)
+            for name, entry in list(_entries.items()):
+                if entry.path == path:
+                    del _entries[name]
+            try:
+                os.remove(path)
+                logging.debug(f"🧹 Sjabloon uit cache verwijderd: {path}")
+            except FileNotFoundError:
+                pass
+
+
+def get_template(template_file: str, opslag: Optional[Opslag] = None) -> Tuple[str, int]:
+    """Geef (lokaal pad, generation) van een sjabloon; download alleen bij een nieuwe versie."""
+    with _lock_for(template_file):
+        entry: Optional[CachedTemplate] = _entries.get(template_file)
+        now = time.monotonic()
+
+        if entry and now - entry.checked_at < CHECK_TTL and os.path.exists(entry.path):
+            _touch(entry.path, entry.size)
+            return entry.path, entry.generation
+
+        opslag = opslag or get_opslag()
+        blob_name = f"{TEMPLATE_PREFIX}/{template_file}"
+        meta = opslag.metadata(TEMPLATE_BUCKET, blob_name)
+        if meta is None:
+            raise FileNotFoundError(f"Sjabloon niet gevonden in de opslag: {blob_name}")
+        generation = int(meta.generation)
+        path = _local_path(template_file, generation)
+
+        if os.path.exists(path):
+            size = os.path.getsize(path)
+        else:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+            try:
+                opslag.download_naar_bestand(TEMPLATE_BUCKET, blob_name, tmp, generation=generation)
+                os.replace(tmp, path)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            size = os.path.getsize(path)
+            logging.debug(f"⬇️ Sjabloon gedownload: {blob_name} (generation {generation})")
+
+        _entries[template_file] = CachedTemplate(path, generation, size, now)
+        _touch(path, size)
+        _evict(keep=path)
+        return path, generation
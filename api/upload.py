@@ -0,0 +1,238 @@
+# api/upload.py
+"""
+Foto's als multipart-upload in plaats van als URL's.
+
+De body wordt in stukken gelezen en met python-multipart geparsed; elke foto
+gaat naar een FotoSpool (boven UPLOAD_SPOOL_BYTES naar een tijdelijk bestand,
+dat daarna zonder kopie als GespildeFoto verder gaat). Zodra een foto binnen is, start de voorbereiding voor zijn eerste
+placeholder al in de procespool, terwijl de rest van de body nog binnenkomt.
+Velden (template_file, target_dpi, ...) moeten vóór de foto's worden gestuurd
+om van die vroege start te profiteren.
+"""
+import asyncio
+import contextvars
+import logging
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from fastapi import HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import python_multipart as multipart
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError:  # oudere python-multipart
+    import multipart
+    from multipart.multipart import parse_options_header
+
+from api.deck import load_template, photo_budget
+from scripts.beeldverwerking import FotoMemo, FotoTaak
+from scripts.opslag import Opslag
+from scripts.schijfbuffer import FotoBuffer, FotoSpool, GespildeFoto
+from scripts.zip_invoer import is_foto_data
+
+UPLOAD_SPOOL_BYTES = int(os.getenv("UPLOAD_SPOOL_BYTES", str(2 * 1024 * 1024)))
+UPLOAD_MAX_PHOTO_BYTES = int(os.getenv("UPLOAD_MAX_PHOTO_BYTES", str(64 * 1024 * 1024)))
+UPLOAD_MAX_TOTAL_BYTES = int(os.getenv("UPLOAD_MAX_TOTAL_BYTES", str(1024 * 1024 * 1024)))
+UPLOAD_MAX_PHOTOS = int(os.getenv("UPLOAD_MAX_PHOTOS", "500"))
+UPLOAD_PREP_WORKERS = int(os.getenv("UPLOAD_PREP_WORKERS", "4"))
+MAX_FIELD_BYTES = 64 * 1024
+
+# Threads wachten alleen op de procespool of de sjabloon-cache; het echte werk gebeurt daar.
+# Sjablonen laden in een eigen pool: een voorbereiding wacht op het sjabloon en mag
+# dus nooit een thread bezetten die dat sjabloon nog moet laden.
+_prep_executor = ThreadPoolExecutor(max_workers=UPLOAD_PREP_WORKERS, thread_name_prefix="upload-prep")
+_template_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="upload-sjabloon")
+
+
+def _int_or_none(value: Optional[str]) -> Optional[int]:
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+class _Part:
+    def __init__(self):
+        self.headers: Dict[bytes, bytes] = {}
+        self.name: Optional[str] = None
+        self.filename: Optional[str] = None
+        self.file: Optional[FotoSpool] = None
+        self.data = bytearray()
+        self.size = 0
+
+
+class PhotoUpload:
+    """Eén multipart-request: velden, foto's in volgorde van binnenkomst en de vroege voorbereiding."""
+
+    def __init__(self, opslag: Opslag):
+        self.opslag = opslag
+        self.fields: Dict[str, str] = {}
+        self.foto_data: Dict[str, "bytes | GespildeFoto"] = {}
+        self.fotos: List[str] = []
+        self.memo = FotoMemo()
+        # Boven SPILL_PHOTO_BYTES gaan de foto's van deze upload naar schijf
+        self.buffer = FotoBuffer()
+        self.total_bytes = 0
+        self._template: Optional[Future] = None
+        self._template_file: Optional[str] = None
+        self._prep: List[Future] = []
+        self._events: list = []
+        self._part = _Part()
+        self._header_field = b""
+        self._header_value = b""
+
+    # --- parser-callbacks: alleen gebeurtenissen verzamelen, verwerking in receive()
+
+    def _on_part_begin(self):
+        self._events.append(("begin", None))
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        self._events.append(("data", data[start:end]))
+
+    def _on_part_end(self):
+        self._events.append(("end", None))
+
+    def _on_header_field(self, data: bytes, start: int, end: int):
+        self._header_field += data[start:end]
+
+    def _on_header_value(self, data: bytes, start: int, end: int):
+        self._header_value += data[start:end]
+
+    def _on_header_end(self):
+        self._events.append(("header", (self._header_field.lower(), self._header_value)))
+        self._header_field = b""
+        self._header_value = b""
+
+    def _on_headers_finished(self):
+        self._events.append(("headers_finished", None))
+
+    # --- verwerking
+
+    async def receive(self, request: Request) -> None:
+        """Lees en parse de body; foto's worden per stuk voorbereid zodra ze compleet zijn."""
+        _, params = parse_options_header(request.headers.get("content-type", ""))
+        boundary = params.get(b"boundary")
+        if not boundary:
+            raise HTTPException(status_code=400, detail="Verwacht multipart/form-data met een boundary")
+
+        parser = multipart.MultipartParser(boundary, {
+            "on_part_begin": self._on_part_begin,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+            "on_header_field": self._on_header_field,
+            "on_header_value": self._on_header_value,
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+        })
+        try:
+            async for chunk in request.stream():
+                parser.write(chunk)
+                await self._handle_events()
+            parser.finalize()
+            await self._handle_events()
+        except multipart.exceptions.MultipartParseError as e:
+            raise HTTPException(status_code=400, detail=f"Ongeldige multipart-body: {e}")
+        finally:
+            if self._part.file is not None:
+                self._part.file.close()
+
+    async def _handle_events(self) -> None:
+        events, self._events = self._events, []
+        for kind, value in events:
+            part = self._part
+            if kind == "begin":
+                self._part = _Part()
+            elif kind == "header":
+                part.headers[value[0]] = value[1]
+            elif kind == "headers_finished":
+                self._start_part(part)
+            elif kind == "data":
+                await self._write(part, value)
+            elif kind == "end":
+                await self._finish_part(part)
+
+    def _start_part(self, part: _Part) -> None:
+        _, options = parse_options_header(part.headers.get(b"content-disposition", b""))
+        part.name = options.get(b"name", b"").decode("utf-8", "replace")
+        if b"filename" in options:
+            if len(self.fotos) >= UPLOAD_MAX_PHOTOS:
+                raise HTTPException(status_code=413, detail=f"Maximaal {UPLOAD_MAX_PHOTOS} foto's per upload")
+            part.filename = options[b"filename"].decode("utf-8", "replace")
+            part.file = FotoSpool(UPLOAD_SPOOL_BYTES)
+
+    async def _write(self, part: _Part, data: bytes) -> None:
+        part.size += len(data)
+        if part.file is None:
+            if part.size > MAX_FIELD_BYTES:
+                raise HTTPException(status_code=413, detail=f"Veld {part.name} is te groot")
+            part.data.extend(data)
+            return
+        self.total_bytes += len(data)
+        if part.size > UPLOAD_MAX_PHOTO_BYTES:
+            raise HTTPException(status_code=413, detail=f"Foto {part.filename} is groter dan {UPLOAD_MAX_PHOTO_BYTES // (1024 * 1024)} MB")
+        if self.total_bytes > UPLOAD_MAX_TOTAL_BYTES:
+            raise HTTPException(status_code=413, detail="Upload is te groot")
+        if part.file.op_schijf:
+            # Al naar schijf geschreven: niet blokkerend op de event loop
+            await run_in_threadpool(part.file.write, data)
+        else:
+            part.file.write(data)
+
+    async def _finish_part(self, part: _Part) -> None:
+        if part.file is None:
+            if part.name:
+                self.fields[part.name] = part.data.decode("utf-8", "replace")
+            return
+        try:
+            if not is_foto_data(part.file.kop):
+                logging.error(f"❌ Geen JPEG/PNG, overgeslagen: {part.filename}")
+                return
+            # Een foto die al op schijf staat gaat als bestand verder, niet terug in het geheugen
+            data = part.file.neem()
+        finally:
+            part.file.close()
+            part.file = None
+        self._add_photo(part.filename or "foto", data)
+
+    def _add_photo(self, filename: str, data: "bytes | GespildeFoto") -> None:
+        index = len(self.fotos)
+        naam = f"upload:{index}:{filename}"
+        data = self.buffer.bewaar(data)
+        self.fotos.append(naam)
+        self.foto_data[naam] = data
+        if self._template is None:
+            self._load_template()
+        self._prep.append(_prep_executor.submit(self._prepare_first, self._template, index, data))
+
+    def _prepare_first(self, template: Future, index: int, data: "bytes | GespildeFoto") -> None:
+        """Foto i komt in elk geval in placeholder i (als die bestaat): die uitsnede alvast maken."""
+        sjabloon = template.result()
+        if template is not self._template:
+            # template_file kwam na deze foto: een uitsnede voor het oude sjabloon is zinloos
+            return
+        placeholders = sjabloon.picture_placeholders
+        if index >= len(placeholders):
+            return
+        ph = placeholders[index]
+        budget = photo_budget(sjabloon, _int_or_none(self.fields.get("max_output_bytes")), len(placeholders))
+        taak = FotoTaak(data, ph.width, ph.height, dpi=_int_or_none(self.fields.get("target_dpi")), max_bytes=budget)
+        self.memo.bereid_voor([taak], forceer_pool=True)
+
+    def _load_template(self) -> None:
+        self._template_file = self.fields.get("template_file")
+        # Met de context van het request, zodat de stap "sjabloon" meetelt in de tijden
+        ctx = contextvars.copy_context()
+        self._template = _template_executor.submit(ctx.run, load_template, self._template_file, self.opslag)
+
+    async def template(self):
+        """Het sjabloon (al geladen bij de eerste foto, anders nu)."""
+        if self._template is None or self.fields.get("template_file") != self._template_file:
+            # Geen foto's, of template_file kwam pas na de foto's
+            self._load_template()
+        return await asyncio.wrap_future(self._template)
+
+    async def prepared(self) -> None:
+        """Wacht tot de vroege voorbereiding klaar is; fouten komen later in de gewone flow terug."""
+        await asyncio.gather(*(asyncio.wrap_future(f) for f in self._prep), return_exceptions=True)
@@ -0,0 +1,66 @@
+# api/warmup.py
+"""
+Warm-up bij het opstarten (STARTUP_WARMUP=1).
+
+api.main laadt python-pptx, Pillow en requests pas bij het eerste request;
+daardoor is het proces snel "ready". Met de warm-up gebeurt dat werk alsnog
+vóór het eerste request, samen met de rest van wat anders het eerste request
+vertraagt: opslagclient, HTTP-sessie, sjablonen (download + compilatie) en de
+workers van de procespool (spawn + imports).
+"""
+import logging
+import os
+import time
+from typing import Dict
+
+WARMUP_ENABLED = os.getenv("STARTUP_WARMUP", "0").lower() in ("1", "true", "yes")
+# Komma-gescheiden; leeg = alleen het standaardsjabloon
+WARMUP_TEMPLATES = os.getenv("WARMUP_TEMPLATES", "")
+
+
+def _stap(tijden: Dict[str, float], naam: str, fn) -> None:
+    t0 = time.perf_counter()
+    try:
+        fn()
+    except Exception as e:
+        # Een mislukte warm-up mag het opstarten niet blokkeren: het eerste request doet het dan alsnog
+        logging.error(f"❌ Warm-up '{naam}' mislukt: {e}")
+    tijden[naam] = round((time.perf_counter() - t0) * 1000, 1)
+
+
+def _imports() -> None:
+    import api.deck  # noqa: F401  (pptx, Pillow, requests, engine)
+    import api.upload  # noqa: F401
+
+
+def _templates() -> None:
+    from api.deck import DEFAULT_TEMPLATE, load_template
+    from scripts.opslag import get_opslag
+
+    namen = [n.strip() for n in WARMUP_TEMPLATES.split(",") if n.strip()] or [DEFAULT_TEMPLATE]
+    for naam in namen:
+        load_template(naam, get_opslag())
+
+
+def _pool() -> None:
+    from scripts.beeldverwerking import POOL_WORKERS, FotoBundel, _get_pool, _verwerk_bundel
+
+    if POOL_WORKERS <= 1:
+        return
+    # Eén lege bundel per worker: start de processen en laadt de modules in elke worker
+    list(_get_pool().map(_verwerk_bundel, [FotoBundel(b"", ())] * POOL_WORKERS))
+
+
+def warm_up() -> Dict[str, float]:
+    """Doe het eenmalige opstartwerk nu; geeft de tijd per stap in ms."""
+    from scripts.foto_download import _get_session
+    from scripts.opslag import get_opslag
+
+    tijden: Dict[str, float] = {}
+    _stap(tijden, "imports", _imports)
+    _stap(tijden, "opslag", get_opslag)
+    _stap(tijden, "http_sessie", _get_session)
+    _stap(tijden, "sjablonen", _templates)
+    _stap(tijden, "procespool", _pool)
+    logging.debug(f"🔥 Warm-up klaar: {tijden}")
+    return tijden
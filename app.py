@@ -1,36 +1,81 @@
 import os
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+import uuid
+from fastapi import FastAPI, HTTPException, Header
+from fastapi.responses import FileResponse, JSONResponse
+from pydantic import BaseModel, validator
+from starlette.background import BackgroundTask
 from scripts.maak_presentatie import maak_presentatie_automatisch
+from api.jobs import router as jobs_router, submit_job
+from api.profiling import profile_requested
+from scripts.profilering import ProfielBezet
+from scripts.opslag import PPTX_CONTENT_TYPE
 
 app = FastAPI()
+app.include_router(jobs_router)
 
 class PresentatieData(BaseModel):
     naam: str
     sjabloon: str
     fotos: list[str]
     datums: str | None = None
+    async_job: bool = False
+    callback_url: str | None = None
+    # ✅ Het .pptx-bestand zelf als response i.p.v. een pad op deze server
+    stream: bool = False
+
+    @validator("stream")
+    def stream_not_async(cls, v, values):
+        if v and values.get("async_job"):
+            raise ValueError("stream kan niet samen met async_job")
+        return v
 
 @app.get("/")
 def home():
     return {"status": "online"}
 
 @app.post("/generate")
-def generate(data: PresentatieData):
-    try:
-        resultaat_pad = maak_presentatie_automatisch(
-            sjabloon_pad=data.sjabloon,
-            base44_foto_urls=data.fotos,
-            titel_naam=data.naam,
-            titel_datums=data.datums,
-            ratio_mode="cover",
-            repeat_if_insufficient=True
-        )
-        return {"status": "success", "download_url": resultaat_pad}
+def generate(data: PresentatieData, x_profile: str | None = Header(None), x_api_key: str | None = Header(None)):
+    profiel = profile_requested(x_profile, x_api_key)
+    if data.async_job:
+        job = submit_job(lambda: _maak(data, profiel), callback_url=data.callback_url)
+        return JSONResponse(status_code=202, content=job.as_dict())
 
+    try:
+        resultaat = _maak(data, profiel)
+    except ProfielBezet as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+    if data.stream:
+        return _als_bestand(resultaat["download_url"])
+    return resultaat
+
+
+def _als_bestand(pad: str) -> FileResponse:
+    """Stuur het deck in stukken naar de client en ruim het daarna op."""
+    return FileResponse(
+        pad,
+        media_type=PPTX_CONTENT_TYPE,
+        filename=os.path.basename(pad),
+        background=BackgroundTask(os.remove, pad),
+    )
+
+
+def _maak(data: PresentatieData, profiel: bool = False) -> dict:
+    # Eigen bestandsnaam per build: jobs en requests lopen gelijktijdig
+    resultaat_pad = maak_presentatie_automatisch(
+        sjabloon_pad=data.sjabloon,
+        uitvoer_pad=f"{uuid.uuid4().hex[:8]}_presentatie.pptx",
+        base44_foto_urls=data.fotos,
+        titel_naam=data.naam,
+        titel_datums=data.datums,
+        ratio_mode="cover",
+        repeat_if_insufficient=True,
+        profiel=profiel,
+    )
+    return {"status": "success", "download_url": resultaat_pad}
+
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,61 @@
+# benchmarks/bench_decode.py
+# -*- coding: utf-8 -*-
+"""
+Benchmark: foto voorbereiden met volledige decode (oude route) tegenover
+verkleind decoderen (draft/reduce + EXIF in dezelfde stap).
+
+Per resolutie: tijd per foto en de grootte van de gedecodeerde pixelbuffer
+(breedte × hoogte × kanalen), de grootste allocatie per foto.
+
+Gebruik:  python -m benchmarks.bench_decode --resoluties 12mp 48mp --herhalingen 5
+"""
+
+import argparse
+import io
+import statistics
+import time
+
+from PIL import Image, ImageOps
+from pptx.util import Inches
+
+from benchmarks.synthetisch import TELEFOON_RESOLUTIES, maak_foto
+from scripts.beeldverwerking import _bereid_beeld, decodeer_verkleind, doel_pixels
+
+# Placeholder van een volledige 16:9-dia
+BREEDTE, HOOGTE = Inches(13.333), Inches(7.5)
+
+
+def _oud(data: bytes):
+    with Image.open(io.BytesIO(data)) as im:
+        img = ImageOps.exif_transpose(im)
+        img.load()
+        buffer = img.width * img.height * len(img.getbands())
+        return _bereid_beeld(img, BREEDTE, HOOGTE), buffer
+
+
+def _nieuw(data: bytes):
+    img = decodeer_verkleind(data, doel_pixels(BREEDTE, HOOGTE))
+    buffer = img.width * img.height * len(img.getbands())
+    return _bereid_beeld(img, BREEDTE, HOOGTE), buffer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--resoluties", nargs="+", choices=sorted(TELEFOON_RESOLUTIES), default=["12mp", "48mp"])
+    parser.add_argument("--herhalingen", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'resolutie':>10} {'route':>7} {'ms/foto':>9} {'buffer MB':>10}")
+    for naam in args.resoluties:
+        data = maak_foto(*TELEFOON_RESOLUTIES[naam])
+        for route, functie in (("oud", _oud), ("nieuw", _nieuw)):
+            tijden = []
+            for _ in range(args.herhalingen):
+                t0 = time.perf_counter()
+                _, buffer = functie(data)
+                tijden.append(time.perf_counter() - t0)
+            print(f"{naam:>10} {route:>7} {statistics.median(tijden) * 1000:9.1f} {buffer / 1e6:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+# benchmarks/bench_koude_start.py
+# -*- coding: utf-8 -*-
+"""
+Benchmark: koude start van de service.
+
+- importtijd van api.main in een vers proces (mediaan);
+- tijd tot "ready" (GET / antwoordt) en tijd tot het eerste gelukte
+  generate-request, met uvicorn als apart proces, lokale opslag en een lokale
+  fotoserver; met en zonder STARTUP_WARMUP.
+
+Gebruik:  python -m benchmarks.bench_koude_start --herhalingen 3 --fotos 10
+"""
+
+import argparse
+import glob
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from benchmarks.loadtest import SJABLONEN_MAP
+from benchmarks.nep_diensten import FotoServer
+from benchmarks.synthetisch import TELEFOON_RESOLUTIES, maak_foto
+
+REPO = os.path.dirname(SJABLONEN_MAP)
+
+
+def _importtijd() -> float:
+    code = "import time; t = time.perf_counter(); import api.main; print(time.perf_counter() - t)"
+    uit = subprocess.run(
+        [sys.executable, "-c", code], cwd=REPO, capture_output=True, text=True, check=True,
+        env=dict(os.environ, LOG_LEVEL="WARNING"),
+    )
+    return float(uit.stdout.strip().splitlines()[-1])
+
+
+def _vrije_poort() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _koude_start(warmup: bool, opslag_map: str, payload: dict) -> dict:
+    poort = _vrije_poort()
+    env = dict(
+        os.environ,
+        STORAGE_BACKEND="local",
+        LOCAL_STORAGE_DIR=opslag_map,
+        TEMPLATE_CACHE_DIR=tempfile.mkdtemp(prefix="sjabloon-cache-"),
+        RESULT_CACHE_ENABLED="0",
+        STARTUP_WARMUP="1" if warmup else "0",
+        WARMUP_TEMPLATES=payload["template_file"],
+        LOG_LEVEL="WARNING",
+    )
+    t0 = time.perf_counter()
+    proces = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--port", str(poort), "--log-level", "warning"],
+        cwd=REPO, env=env,
+    )
+    basis_url = f"http://127.0.0.1:{poort}"
+    try:
+        while True:
+            try:
+                requests.get(f"{basis_url}/", timeout=1)
+                break
+            except requests.ConnectionError:
+                if proces.poll() is not None:
+                    raise RuntimeError("uvicorn is gestopt tijdens het opstarten")
+                time.sleep(0.01)
+        ready = time.perf_counter() - t0
+
+        t1 = time.perf_counter()
+        r = requests.post(f"{basis_url}/v1/generate-presentation", json=payload, timeout=600)
+        r.raise_for_status()
+        eerste = time.perf_counter() - t1
+    finally:
+        proces.terminate()
+        proces.wait(timeout=30)
+        shutil.rmtree(env["TEMPLATE_CACHE_DIR"], ignore_errors=True)
+    return {"ready_s": ready, "eerste_request_s": eerste, "totaal_s": ready + eerste}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--herhalingen", type=int, default=3)
+    parser.add_argument("--fotos", type=int, default=10)
+    parser.add_argument("--resolutie", choices=sorted(TELEFOON_RESOLUTIES), default="12mp")
+    parser.add_argument("--sjabloon", default="SjabloonRustig.pptx")
+    parser.add_argument("--uit", help="schrijf JSON naar dit bestand")
+    args = parser.parse_args()
+
+    from api.template_cache import TEMPLATE_BUCKET, TEMPLATE_PREFIX
+
+    opslag_map = tempfile.mkdtemp(prefix="uitvaart-opslag-")
+    sjabloon_map = os.path.join(opslag_map, TEMPLATE_BUCKET, TEMPLATE_PREFIX)
+    os.makedirs(sjabloon_map)
+    for pad in glob.glob(os.path.join(SJABLONEN_MAP, "*.pptx")):
+        shutil.copy(pad, sjabloon_map)
+
+    breedte, hoogte = TELEFOON_RESOLUTIES[args.resolutie]
+    fotoserver = FotoServer([maak_foto(breedte, hoogte, variant=i) for i in range(args.fotos)]).start()
+    payload = {
+        "collection": "koude-start",
+        "photos": fotoserver.urls(),
+        "output_bucket": "koude-start-output",
+        "output_filename": "deck.pptx",
+        "template_file": args.sjabloon,
+    }
+
+    try:
+        rapport = {
+            "parameters": vars(args),
+            "import_api_main_s": statistics.median(_importtijd() for _ in range(args.herhalingen)),
+        }
+        for warmup in (False, True):
+            metingen = [_koude_start(warmup, opslag_map, payload) for _ in range(args.herhalingen)]
+            rapport["warmup" if warmup else "zonder_warmup"] = {
+                sleutel: statistics.median(m[sleutel] for m in metingen) for sleutel in metingen[0]
+            }
+    finally:
+        fotoserver.stop()
+        shutil.rmtree(opslag_map, ignore_errors=True)
+
+    tekst = json.dumps(rapport, indent=2)
+    if args.uit:
+        with open(args.uit, "w") as f:
+            f.write(tekst + "\n")
+    print(tekst)
+
+
+if __name__ == "__main__":
+    main()
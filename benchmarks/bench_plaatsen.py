@@ -0,0 +1,100 @@
+# benchmarks/bench_plaatsen.py
+# -*- coding: utf-8 -*-
+"""
+Benchmark: tijd per placeholder voor _replace_shape_with_picture,
+oude route (PNG via tijdelijk bestand) tegenover de huidige in-memory JPEG-route.
+
+Gebruik:  python -m benchmarks.bench_plaatsen --placeholders 20 --breedte 4032 --hoogte 3024
+"""
+
+import argparse
+import io
+import os
+import statistics
+import tempfile
+import time
+
+from pptx import Presentation
+from pptx.enum.shapes import PP_PLACEHOLDER
+from pptx.util import Inches
+from PIL import Image
+
+from benchmarks.synthetisch import maak_foto
+from scripts.beeldverwerking import _crop_to_ratio
+from scripts.maak_presentatie import _replace_shape_with_picture
+
+
+def _oud_replace_shape_with_picture(slide, shape, image_path: str):
+    """Oorspronkelijke implementatie: cropped PNG via NamedTemporaryFile."""
+    left, top, width, height = shape.left, shape.top, shape.width, shape.height
+    if getattr(shape, "is_placeholder", False):
+        try:
+            if shape.placeholder_format.type == PP_PLACEHOLDER.PICTURE:
+                with Image.open(image_path) as im:
+                    cropped = _crop_to_ratio(im, width, height)
+                    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tf:
+                        cropped.save(tf.name)
+                        tmp = tf.name
+                shape.insert_picture(tmp)
+                os.remove(tmp)
+                return
+        except Exception:
+            pass
+    shape._element.getparent().remove(shape._element)
+    with Image.open(image_path) as im:
+        cropped = _crop_to_ratio(im, width, height)
+        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tf:
+            cropped.save(tf.name)
+            tmp = tf.name
+    slide.shapes.add_picture(tmp, left, top, width=width, height=height)
+    os.remove(tmp)
+
+
+def _bouw_presentatie(aantal: int):
+    """Presentatie met per dia één vorm 'foto_N' van 4×3 inch."""
+    prs = Presentation()
+    doelen = []
+    for i in range(1, aantal + 1):
+        slide = prs.slides.add_slide(prs.slide_layouts[6])
+        shape = slide.shapes.add_shape(1, Inches(1), Inches(1), Inches(4), Inches(3))
+        shape.name = f"foto_{i}"
+        doelen.append((slide, shape))
+    return prs, doelen
+
+
+def _meet(functie, foto: str, aantal: int) -> tuple[list[float], int]:
+    prs, doelen = _bouw_presentatie(aantal)
+    tijden = []
+    for slide, shape in doelen:
+        t0 = time.perf_counter()
+        functie(slide, shape, foto)
+        tijden.append(time.perf_counter() - t0)
+    buf = io.BytesIO()
+    prs.save(buf)
+    return tijden, buf.tell()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--placeholders", type=int, default=20)
+    parser.add_argument("--breedte", type=int, default=4032)
+    parser.add_argument("--hoogte", type=int, default=3024)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench_plaatsen_") as tmp:
+        foto = os.path.join(tmp, "foto.jpg")
+        with open(foto, "wb") as f:
+            f.write(maak_foto(args.breedte, args.hoogte))
+
+        for label, functie in (("oud (PNG + tempfile)", _oud_replace_shape_with_picture),
+                               ("nieuw (JPEG in geheugen)", _replace_shape_with_picture)):
+            tijden, grootte = _meet(functie, foto, args.placeholders)
+            print(
+                f"{label:26s} mediaan {statistics.median(tijden) * 1000:8.1f} ms/placeholder"
+                f"   p90 {sorted(tijden)[int(len(tijden) * 0.9) - 1] * 1000:8.1f} ms"
+                f"   pptx {grootte / 1e6:8.1f} MB"
+            )
+
+
+if __name__ == "__main__":
+    main()
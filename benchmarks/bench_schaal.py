@@ -0,0 +1,86 @@
+# benchmarks/bench_schaal.py
+# -*- coding: utf-8 -*-
+"""
+Benchmark: placeholder-detectie en dia-koppeling bij 10, 100 en 500 dia's.
+
+Vergelijkt de oude aanpak (recursieve generator + per placeholder `shape in
+s.shapes` over alle dia's) met de huidige index in één doorloop. De kolom
+µs/dia hoort voor de nieuwe aanpak constant te blijven (lineair gedrag).
+
+Gebruik:  python -m benchmarks.bench_schaal --dias 10 100 500 [--zonder-oud]
+"""
+
+import argparse
+import io
+import time
+
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE_TYPE
+
+from benchmarks.synthetisch import maak_sjabloon
+from scripts.maak_presentatie import _PLACEHOLDER_RE, _collect_named_placeholders, compileer_sjabloon, direct_op_dia
+
+
+def _oud_iter(container):
+    for sh in container.shapes:
+        yield sh
+        if sh.shape_type == MSO_SHAPE_TYPE.GROUP:
+            for inner in _oud_iter(sh):
+                yield inner
+
+
+def _oud_koppel(prs):
+    """Oorspronkelijke route uit vervang_placeholder_fotos."""
+    matches = []
+    for slide in prs.slides:
+        for sh in _oud_iter(slide):
+            m = _PLACEHOLDER_RE.match(getattr(sh, "name", None) or "")
+            if m:
+                matches.append((int(m.group(1)), sh))
+    matches.sort(key=lambda t: t[0])
+    paren = []
+    for _, shape in matches:
+        for s in prs.slides:
+            if shape in s.shapes:
+                paren.append((s, shape))
+                break
+    return paren
+
+
+def _nieuw_koppel(prs):
+    return [(rec.slide, rec.shape) for _, rec in _collect_named_placeholders(prs)]
+
+
+def _tijd(functie, *args) -> tuple[float, object]:
+    t0 = time.perf_counter()
+    resultaat = functie(*args)
+    return time.perf_counter() - t0, resultaat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dias", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--zonder-oud", action="store_true", help="oude O(n²)-route overslaan")
+    args = parser.parse_args()
+
+    print(f"{'dia’s':>6} {'placeholders':>12} {'nieuw s':>9} {'µs/dia':>8} {'compileer s':>12} {'oud s':>9} {'µs/dia':>8}")
+    for n in args.dias:
+        blob = maak_sjabloon(n, picture_elke=5)
+        prs = Presentation(io.BytesIO(blob))
+
+        t_nieuw, paren = _tijd(_nieuw_koppel, prs)
+        t_comp, _ = _tijd(compileer_sjabloon, f"synthetisch-{n}", 1, blob)
+
+        oud = ""
+        if not args.zonder_oud:
+            t_oud, paren_oud = _tijd(_oud_koppel, prs)
+            # De oude route vindt foto_N in groepen niet; die worden ook nu niet vervangen
+            direct = [(slide, sh) for slide, sh in paren if direct_op_dia(sh)]
+            assert [(s.slide_id, sh.shape_id) for s, sh in paren_oud] == [(s.slide_id, sh.shape_id) for s, sh in direct]
+            oud = f"{t_oud:9.3f} {t_oud / n * 1e6:8.0f}"
+
+        print(f"{n:6d} {len(paren):12d} {t_nieuw:9.3f} {t_nieuw / n * 1e6:8.0f} {t_comp:12.3f} {oud}")
+
+
+if __name__ == "__main__":
+    main()
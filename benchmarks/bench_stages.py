@@ -0,0 +1,165 @@
+# benchmarks/bench_stages.py
+# -*- coding: utf-8 -*-
+"""
+Benchmark per stap van de presentatiebouw, met synthetische sjablonen en foto's.
+
+Stappen: sjabloon laden, placeholder-detectie, klonen uit de cache, foto's
+voorbereiden (decode/crop/encode), invoegen, prs.save en upload naar een lokale
+opslag. Het resultaat is JSON, zodat runs over tijd te vergelijken zijn.
+
+Gebruik:
+    python -m benchmarks.bench_stages --dias 20 --fotos 10 --resolutie 12mp --uit resultaten.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from pptx import Presentation
+
+from benchmarks.synthetisch import TELEFOON_RESOLUTIES, maak_foto, maak_sjabloon
+from scripts.beeldverwerking import FotoMemo, FotoTaak
+from scripts.maak_presentatie import (
+    _collect_named_placeholders,
+    _plaats_foto,
+    compileer_sjabloon,
+    direct_op_dia,
+    indexeer_shapes,
+    kloon_presentatie,
+    zoek_placeholders,
+)
+from scripts.ooxml_schrijver import sla_pakket_op
+from scripts.opslag import LokaleOpslag
+
+
+STAPPEN = ("sjabloon_laden", "placeholders_zoeken", "klonen", "foto_voorbereiden", "invoegen", "opslaan_python_pptx", "opslaan", "upload")
+
+
+@contextmanager
+def _stap(tijden: dict, naam: str):
+    t0 = time.perf_counter()
+    yield
+    tijden.setdefault(naam, []).append(time.perf_counter() - t0)
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def meet(blob: bytes, fotos: list[bytes], opslag: LokaleOpslag, herhalingen: int) -> tuple[dict, dict]:
+    """Voer de hele keten `herhalingen` keer uit en geef (tijden per stap, extra gegevens)."""
+    tijden: dict[str, list[float]] = {}
+    extra = {}
+
+    for run in range(herhalingen):
+        with _stap(tijden, "sjabloon_laden"):
+            prs = Presentation(io.BytesIO(blob))
+
+        with _stap(tijden, "placeholders_zoeken"):
+            index = indexeer_shapes(prs)
+            named = _collect_named_placeholders(prs, index)
+
+        # Gecompileerd sjabloon (buiten de meting) om de kloonstap los te meten
+        sjabloon = compileer_sjabloon("bench", run, blob)
+        with _stap(tijden, "klonen"):
+            prs = kloon_presentatie(sjabloon)
+            doelen = zoek_placeholders(prs, sjabloon.foto_placeholders)
+            doelen += zoek_placeholders(prs, sjabloon.picture_placeholders)
+            doelen = [(slide, sh) for slide, sh in doelen if direct_op_dia(sh)]
+
+        memo = FotoMemo()
+        taken = [FotoTaak(fotos[i % len(fotos)], sh.width, sh.height) for i, (_, sh) in enumerate(doelen)]
+        with _stap(tijden, "foto_voorbereiden"):
+            voorbereid = memo.bereid_voor(taken)
+
+        with _stap(tijden, "invoegen"):
+            for (slide, shape), resultaat in zip(doelen, voorbereid):
+                if resultaat is not None:
+                    _plaats_foto(slide, shape, resultaat[0])
+
+        with _stap(tijden, "opslaan_python_pptx"):
+            buf = io.BytesIO()
+            prs.save(buf)
+
+        with _stap(tijden, "opslaan"):
+            buf = io.BytesIO()
+            sla_pakket_op(prs, buf, sjabloon.blob, sjabloon.zip_index)
+            data = buf.getvalue()
+
+        with _stap(tijden, "upload"):
+            opslag.upload_bytes("bench", f"run_{run}.pptx", data)
+
+        extra = {
+            "placeholders": len(doelen),
+            "foto_N_shapes": len(named),
+            "shapes_totaal": len(index),
+            "decodes": memo.verwerkt,
+            "deck_bytes": len(data),
+        }
+
+    return tijden, extra
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--dias", type=int, default=20)
+    parser.add_argument("--fotos-per-dia", type=int, default=2, help="foto_N-shapes per dia")
+    parser.add_argument("--picture-elke", type=int, default=4, help="elke k-de dia krijgt een PICTURE-placeholder (0 = nooit)")
+    parser.add_argument("--zonder-groepen", action="store_true")
+    parser.add_argument("--fotos", type=int, default=10, help="aantal verschillende foto's")
+    parser.add_argument("--resolutie", choices=sorted(TELEFOON_RESOLUTIES), default="12mp")
+    parser.add_argument("--formaat", choices=["JPEG", "PNG"], default="JPEG")
+    parser.add_argument("--herhalingen", type=int, default=3)
+    parser.add_argument("--uit", help="schrijf JSON naar dit bestand (standaard stdout)")
+    args = parser.parse_args()
+
+    breedte, hoogte = TELEFOON_RESOLUTIES[args.resolutie]
+    blob = maak_sjabloon(args.dias, args.fotos_per_dia, not args.zonder_groepen, args.picture_elke)
+    fotos = [maak_foto(breedte, hoogte, args.formaat, variant=i) for i in range(args.fotos)]
+
+    with tempfile.TemporaryDirectory(prefix="bench_stages_") as tmp:
+        tijden, extra = meet(blob, fotos, LokaleOpslag(tmp), args.herhalingen)
+
+    resultaat = {
+        "meta": {
+            "tijdstip": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "parameters": vars(args) | {"sjabloon_bytes": len(blob), "foto_bytes": sum(map(len, fotos))},
+        },
+        "gegevens": extra,
+        "stappen": {
+            naam: {
+                "mediaan_s": statistics.median(tijden[naam]),
+                "min_s": min(tijden[naam]),
+                "max_s": max(tijden[naam]),
+                "runs": tijden[naam],
+            }
+            for naam in STAPPEN
+        },
+    }
+
+    tekst = json.dumps(resultaat, indent=2)
+    if args.uit:
+        with open(args.uit, "w") as f:
+            f.write(tekst + "\n")
+    else:
+        print(tekst)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+# benchmarks/loadtest.py
+# -*- coding: utf-8 -*-
+"""
+End-to-end loadtest voor /v1/generate-presentation, zonder Base44 of GCS.
+
+Start een lokale fotoserver (met instelbare vertraging en foutkans), vervangt de
+opslag door GeheugenOpslag (sjablonen uit ./sjablonen), draait de FastAPI-app
+met uvicorn op een vrije poort en vuurt requests af met de opgegeven
+gelijktijdigheid. Rapporteert p50/p90/p99-latency, doorvoer (decks per minuut)
+en piek-RSS (inclusief de workers van de procespool).
+
+Gebruik:
+    python -m benchmarks.loadtest --gelijktijdig 4 --verzoeken 40 --fotos 20 --vertraging-ms 80 --foutkans 0.02
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import resource
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from benchmarks.nep_diensten import FotoServer, GeheugenOpslag
+from benchmarks.synthetisch import TELEFOON_RESOLUTIES, maak_foto
+from scripts.opslag import zet_opslag
+
+SJABLONEN_MAP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "sjablonen")
+
+
+# ---------------------------
+# Geheugenmeting
+# ---------------------------
+
+def _vmrss_kb(pid: str) -> int:
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for regel in f:
+                if regel.startswith("VmRSS:"):
+                    return int(regel.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def _kinderen(pid: str) -> list[str]:
+    pids = []
+    for pad in glob.glob(f"/proc/{pid}/task/*/children"):
+        try:
+            with open(pad) as f:
+                pids.extend(f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+class RssMeter:
+    """Meet periodiek de RSS van dit proces plus alle (klein)kinderen en onthoudt de piek."""
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.piek_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+
+    def _totaal_kb(self) -> int:
+        totaal, te_doen = 0, [str(os.getpid())]
+        while te_doen:
+            pid = te_doen.pop()
+            totaal += _vmrss_kb(pid)
+            te_doen.extend(_kinderen(pid))
+        return totaal
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.piek_kb = max(self.piek_kb, self._totaal_kb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        if not self.piek_kb:
+            # Geen /proc (bijv. macOS): val terug op de maximale RSS van dit proces
+            self.piek_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+# ---------------------------
+# App starten
+# ---------------------------
+
+def _start_app():
+    import uvicorn
+    # Identieke requests zouden anders samengevoegd worden; de loadtest meet echte builds
+    os.environ.setdefault("RESULT_CACHE_ENABLED", "0")
+    from api.main import app
+
+    logging.getLogger().setLevel(logging.WARNING)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.bind(("127.0.0.1", 0))
+    server = uvicorn.Server(uvicorn.Config(app, log_level="warning"))
+    thread = threading.Thread(target=server.run, kwargs={"sockets": [sock]}, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    host, port = sock.getsockname()
+    return server, thread, f"http://{host}:{port}"
+
+
+def _percentiel(waarden: list[float], p: int) -> float:
+    if len(waarden) < 2:
+        return waarden[0] if waarden else 0.0
+    return statistics.quantiles(waarden, n=100, method="inclusive")[p - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--gelijktijdig", type=int, default=4)
+    parser.add_argument("--verzoeken", type=int, default=40)
+    parser.add_argument("--opwarmen", type=int, default=1, help="requests vooraf, niet meegeteld")
+    parser.add_argument("--fotos", type=int, default=20, help="foto's per request")
+    parser.add_argument("--resolutie", choices=sorted(TELEFOON_RESOLUTIES), default="12mp")
+    parser.add_argument("--vertraging-ms", type=float, default=50.0)
+    parser.add_argument("--spreiding-ms", type=float, default=50.0)
+    parser.add_argument("--foutkans", type=float, default=0.0)
+    parser.add_argument("--upload-s-per-mb", type=float, default=0.0, help="gesimuleerde uploadtijd")
+    parser.add_argument("--sjabloon", default="SjabloonRustig.pptx")
+    parser.add_argument("--uit", help="schrijf JSON naar dit bestand")
+    args = parser.parse_args()
+
+    from api.template_cache import TEMPLATE_BUCKET, TEMPLATE_PREFIX
+
+    opslag = GeheugenOpslag(vertraging_s_per_mb=args.upload_s_per_mb, bewaar_uploads=False)
+    for pad in glob.glob(os.path.join(SJABLONEN_MAP, "*.pptx")):
+        with open(pad, "rb") as f:
+            opslag.zet(TEMPLATE_BUCKET, f"{TEMPLATE_PREFIX}/{os.path.basename(pad)}", f.read())
+    zet_opslag(opslag)
+
+    breedte, hoogte = TELEFOON_RESOLUTIES[args.resolutie]
+    fotoserver = FotoServer(
+        [maak_foto(breedte, hoogte, variant=i) for i in range(args.fotos)],
+        vertraging_ms=args.vertraging_ms,
+        spreiding_ms=args.spreiding_ms,
+        foutkans=args.foutkans,
+    ).start()
+
+    server, thread, basis_url = _start_app()
+    payload = {
+        "collection": "loadtest",
+        "photos": fotoserver.urls(),
+        "output_bucket": "loadtest-output",
+        "output_filename": "deck.pptx",
+        "template_file": args.sjabloon,
+    }
+    sessie = requests.Session()
+    sessie.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=args.gelijktijdig))
+
+    def _een_request(_):
+        t0 = time.perf_counter()
+        r = sessie.post(f"{basis_url}/v1/generate-presentation", json=payload, timeout=600)
+        return time.perf_counter() - t0, r.status_code
+
+    try:
+        for _ in range(args.opwarmen):
+            _een_request(None)
+
+        with RssMeter() as meter:
+            t_start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=args.gelijktijdig) as pool:
+                uitkomsten = list(pool.map(_een_request, range(args.verzoeken)))
+            duur = time.perf_counter() - t_start
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        fotoserver.stop()
+
+    latencies = [t for t, status in uitkomsten if status == 200]
+    fouten = sum(1 for _, status in uitkomsten if status != 200)
+    rapport = {
+        "parameters": vars(args),
+        "geslaagd": len(latencies),
+        "mislukt": fouten,
+        "duur_s": duur,
+        "decks_per_minuut": len(latencies) / duur * 60 if duur else 0.0,
+        "latency_s": {
+            "p50": _percentiel(latencies, 50),
+            "p90": _percentiel(latencies, 90),
+            "p99": _percentiel(latencies, 99),
+            "max": max(latencies, default=0.0),
+        },
+        "piek_rss_mb": meter.piek_kb / 1024,
+        "foto_verzoeken": fotoserver.verzoeken,
+        "upload_mb": opslag.bytes_geupload / 1e6,
+    }
+
+    tekst = json.dumps(rapport, indent=2)
+    if args.uit:
+        with open(args.uit, "w") as f:
+            f.write(tekst + "\n")
+    print(tekst)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# benchmarks/nep_diensten.py
+# -*- coding: utf-8 -*-
+"""
+Lokale vervangers voor externe diensten, voor loadtests en benchmarks:
+
+- FotoServer: HTTP-server met synthetische foto's, met instelbare vertraging en foutkans
+- GeheugenOpslag: opslagbackend in het geheugen (in plaats van GCS/R2), met optionele vertraging
+"""
+
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scripts.opslag import ObjectMeta, Opslag
+
+
+# ---------------------------
+# Fotoserver
+# ---------------------------
+
+class FotoServer:
+    """Serveert /foto/<i>.jpg uit een lijst met bytes op 127.0.0.1."""
+
+    def __init__(self, fotos: list[bytes], vertraging_ms: float = 0.0, spreiding_ms: float = 0.0, foutkans: float = 0.0):
+        self.fotos = fotos
+        self.vertraging_ms = vertraging_ms
+        self.spreiding_ms = spreiding_ms
+        self.foutkans = foutkans
+        self.verzoeken = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, net als een echte CDN
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with server._lock:
+                    server.verzoeken += 1
+                vertraging = server.vertraging_ms + random.uniform(0, server.spreiding_ms)
+                if vertraging:
+                    time.sleep(vertraging / 1000)
+                if random.random() < server.foutkans:
+                    self.send_response(503)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                try:
+                    i = int(self.path.rsplit("/", 1)[-1].split(".")[0])
+                    data = server.fotos[i]
+                except (ValueError, IndexError):
+                    self.send_response(404)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "image/jpeg")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+    @property
+    def basis_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def urls(self) -> list[str]:
+        return [f"{self.basis_url}/foto/{i}.jpg" for i in range(len(self.fotos))]
+
+    def start(self) -> "FotoServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+# ---------------------------
+# Opslag in het geheugen
+# ---------------------------
+
+class GeheugenOpslag(Opslag):
+    """Nep-GCS/R2: objecten in een dict, generation telt op bij elke upload."""
+
+    naam = "geheugen"
+
+    def __init__(self, vertraging_s_per_mb: float = 0.0, bewaar_uploads: bool = True):
+        super().__init__()
+        self.vertraging_s_per_mb = vertraging_s_per_mb
+        self.bewaar_uploads = bewaar_uploads
+        self._lock = threading.Lock()
+        self._objecten: dict[tuple[str, str], tuple[bytes, int]] = {}
+        self._generation = 0
+        self.uploads = 0
+        self.bytes_geupload = 0
+
+    def _wacht(self, n: int) -> None:
+        if self.vertraging_s_per_mb:
+            time.sleep(self.vertraging_s_per_mb * n / 1e6)
+
+    def metadata(self, bucket, sleutel):
+        with self._lock:
+            obj = self._objecten.get((bucket, sleutel))
+        if obj is None:
+            return None
+        return ObjectMeta(obj[1], len(obj[0]))
+
+    def download_naar_bestand(self, bucket, sleutel, pad, generation=None):
+        with self._lock:
+            data, _ = self._objecten[(bucket, sleutel)]
+        self._wacht(len(data))
+        with open(pad, "wb") as f:
+            f.write(data)
+
+    def zet(self, bucket: str, sleutel: str, data: bytes) -> None:
+        """Leg een object klaar (bijv. een sjabloon), zonder vertraging of telling."""
+        with self._lock:
+            self._generation += 1
+            self._objecten[(bucket, sleutel)] = (bytes(data), self._generation)
+
+    def upload_bytes(self, bucket, sleutel, data, content_type=None):
+        self._wacht(len(data))
+        if self.bewaar_uploads:
+            self.zet(bucket, sleutel, data)
+        with self._lock:
+            self.uploads += 1
+            self.bytes_geupload += len(data)
+
+    def upload_bestand(self, bucket, sleutel, pad, content_type=None):
+        with open(pad, "rb") as f:
+            self.upload_bytes(bucket, sleutel, f.read(), content_type)
+
+    def download_url(self, bucket, sleutel):
+        return f"memory://{bucket}/{sleutel}"
+
+    def _maak_tijdelijke_url(self, bucket, sleutel, seconden):
+        return self.download_url(bucket, sleutel)
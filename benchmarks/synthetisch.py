@@ -0,0 +1,79 @@
+# benchmarks/synthetisch.py
+# -*- coding: utf-8 -*-
+"""
+Synthetische sjablonen en foto's voor benchmarks: N dia's met foto_N-shapes,
+groepen en (optioneel) PICTURE-placeholders, en foto-achtige JPEG/PNG-bestanden
+op telefoonresolutie, zonder afhankelijkheid van de echte sjablonen of Base44.
+"""
+
+import io
+
+from PIL import Image
+from pptx import Presentation
+from pptx.enum.shapes import MSO_SHAPE
+from pptx.util import Inches
+
+
+LAYOUT_LEEG = 6
+LAYOUT_FOTO_MET_BIJSCHRIFT = 8  # bevat een PICTURE-placeholder in het standaardthema
+
+
+def maak_sjabloon(
+    aantal_dias: int,
+    fotos_per_dia: int = 2,
+    met_groepen: bool = True,
+    picture_elke: int = 0,
+) -> bytes:
+    """Bouw een sjabloon en geef de .pptx-bytes.
+
+    Per dia `fotos_per_dia` rechthoeken met naam foto_N, plus (met_groepen) een
+    groep met nog een foto_N en een tekstvak. Met picture_elke=k krijgt elke
+    k-de dia de layout met een PICTURE-placeholder.
+    """
+    prs = Presentation()
+    nummer = 1
+    for i in range(aantal_dias):
+        layout = LAYOUT_FOTO_MET_BIJSCHRIFT if picture_elke and i % picture_elke == 0 else LAYOUT_LEEG
+        slide = prs.slides.add_slide(prs.slide_layouts[layout])
+        slide.shapes.add_textbox(Inches(0.5), Inches(0.2), Inches(6), Inches(0.6)).text_frame.text = f"Dia {i + 1}"
+
+        for k in range(fotos_per_dia):
+            sh = slide.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(0.5 + k * 4.5), Inches(1), Inches(4), Inches(3))
+            sh.name = f"foto_{nummer}"
+            nummer += 1
+
+        if met_groepen:
+            groep = slide.shapes.add_group_shape()
+            sh = groep.shapes.add_shape(MSO_SHAPE.RECTANGLE, Inches(0.5), Inches(4.5), Inches(3), Inches(2))
+            sh.name = f"foto_{nummer}"
+            nummer += 1
+            groep.shapes.add_textbox(Inches(4), Inches(5), Inches(4), Inches(1)).text_frame.text = "Bijschrift"
+
+    buf = io.BytesIO()
+    prs.save(buf)
+    return buf.getvalue()
+
+
+# Gangbare telefoonresoluties (liggend)
+TELEFOON_RESOLUTIES = {
+    "12mp": (4032, 3024),
+    "48mp": (8064, 6048),
+    "fullhd": (1920, 1080),
+}
+
+
+def maak_foto(breedte: int, hoogte: int, formaat: str = "JPEG", variant: int = 0) -> bytes:
+    """Foto-achtig beeld: kleurverloop met ruis (ruis maakt het realistisch zwaar voor PNG).
+
+    `variant` verschuift het verloop, zodat verschillende foto's verschillende bytes hebben.
+    """
+    r = Image.linear_gradient("L").rotate(variant * 37 % 360).resize((breedte, hoogte))
+    g = Image.effect_noise((breedte, hoogte), 48)
+    b = r.transpose(Image.FLIP_LEFT_RIGHT)
+    img = Image.merge("RGB", (r, g, b))
+    buf = io.BytesIO()
+    if formaat.upper() == "PNG":
+        img.save(buf, format="PNG")
+    else:
+        img.save(buf, format="JPEG", quality=92)
+    return buf.getvalue()
@@ -0,0 +1,370 @@
+# scripts/beeldverwerking.py
+# -*- coding: utf-8 -*-
+"""
+Warme Uitvaartassistent — Foto's bijsnijden en verkleinen tot de resolutie van de placeholder
+"""
+
+import io
+import os
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import NamedTuple
+
+from pptx.util import Emu
+from PIL import Image, ImageOps
+
+from scripts.profilering import profiel_actief
+from scripts.schijfbuffer import GespildeFoto
+
+EMU_PER_INCH = 914400
+DOEL_DPI = int(os.getenv("IMAGE_TARGET_DPI", "150"))
+JPEG_KWALITEIT = int(os.getenv("IMAGE_JPEG_QUALITY", "82"))
+MIN_JPEG_KWALITEIT = 50
+# Voorbeeldweergave (API en maak_presentatie_automatisch): miniatuurresolutie
+VOORBEELD_DPI = int(os.getenv("PREVIEW_DPI", "36"))
+VOORBEELD_KWALITEIT = int(os.getenv("PREVIEW_JPEG_QUALITY", "60"))
+
+
+# ---------------------------
+# Geometrie
+# ---------------------------
+
+def _compute_contain_size(img_w: int, img_h: int, box_w_emu: Emu, box_h_emu: Emu) -> tuple[int, int]:
+    """Bereken contain (fit) afmetingen."""
+    box_w = int(box_w_emu)
+    box_h = int(box_h_emu)
+    r = min(box_w / img_w, box_h / img_h)
+    return max(1, int(img_w * r)), max(1, int(img_h * r))
+
+
+def _crop_to_ratio(img: Image.Image, target_w_emu: Emu, target_h_emu: Emu) -> Image.Image:
+    """Crop de afbeelding zodat hij de shape volledig vult (cover)."""
+    img_w, img_h = img.size
+    target_ratio = float(target_w_emu) / float(target_h_emu)
+    img_ratio = img_w / img_h
+
+    if img_ratio > target_ratio:
+        new_w = int(target_ratio * img_h)
+        x0 = (img_w - new_w) // 2
+        return img.crop((x0, 0, x0 + new_w, img_h))
+    else:
+        new_h = int(img_w / target_ratio)
+        y0 = (img_h - new_h) // 2
+        return img.crop((0, y0, img_w, y0 + new_h))
+
+
+def doel_pixels(width_emu: int, height_emu: int, dpi: int | None = None) -> tuple[int, int]:
+    """Pixelafmetingen die een placeholder van width×height EMU bij `dpi` nodig heeft."""
+    dpi = dpi or DOEL_DPI
+    return (
+        max(1, round(int(width_emu) * dpi / EMU_PER_INCH)),
+        max(1, round(int(height_emu) * dpi / EMU_PER_INCH)),
+    )
+
+
+# ---------------------------
+# Normalisatie
+# ---------------------------
+
+def _heeft_alpha(img: Image.Image) -> bool:
+    return img.mode in ("RGBA", "LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+
+
+def _encodeer(img: Image.Image, kwaliteit: int) -> tuple[bytes, str]:
+    """Encodeer als JPEG; alleen bij transparantie als PNG."""
+    buf = io.BytesIO()
+    if _heeft_alpha(img):
+        img.save(buf, format="PNG", optimize=False)
+        return buf.getvalue(), "png"
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    img.save(buf, format="JPEG", quality=kwaliteit, optimize=True, progressive=True)
+    return buf.getvalue(), "jpg"
+
+
+def _bereid_beeld(
+    img: Image.Image,
+    width_emu: int,
+    height_emu: int,
+    ratio_mode: str = "cover",
+    dpi: int | None = None,
+    kwaliteit: int | None = None,
+    max_bytes: int | None = None,
+) -> tuple[bytes, str]:
+    """Crop, verklein en encodeer een al gedecodeerd beeld voor één placeholder."""
+    kwaliteit = kwaliteit or JPEG_KWALITEIT
+    doel_w, doel_h = doel_pixels(width_emu, height_emu, dpi)
+
+    if ratio_mode == "cover":
+        img = _crop_to_ratio(img, width_emu, height_emu)
+    new_w, new_h = _compute_contain_size(img.width, img.height, doel_w, doel_h)
+    if new_w < img.width:
+        img = img.resize((new_w, new_h), Image.LANCZOS)
+
+    encoded, ext = _encodeer(img, kwaliteit)
+
+    # Binnen het budget blijven: eerst kwaliteit omlaag, daarna de resolutie
+    while max_bytes and len(encoded) > max_bytes and ext == "jpg":
+        if kwaliteit > MIN_JPEG_KWALITEIT:
+            kwaliteit = max(MIN_JPEG_KWALITEIT, kwaliteit - 10)
+        elif min(img.size) > 64:
+            img = img.resize((max(1, int(img.width * 0.8)), max(1, int(img.height * 0.8))), Image.LANCZOS)
+        else:
+            break
+        encoded, ext = _encodeer(img, kwaliteit)
+
+    return encoded, ext
+
+
+EXIF_ORIENTATIE = 0x0112
+_GEDRAAID = (5, 6, 7, 8)  # EXIF-oriëntaties met een kwartslag: breedte en hoogte wisselen
+
+
+def decodeer_verkleind(data: bytes | GespildeFoto, doel: tuple[int, int] | None) -> Image.Image:
+    """
+    Decodeer een foto op de kleinste schaal die nog minstens `doel` (w, h, na
+    EXIF-draaiing) groot is, en pas de EXIF-oriëntatie in dezelfde stap toe.
+
+    - JPEG: draft() laat libjpeg direct op 1/2, 1/4 of 1/8 decoderen; de volledige
+      resolutie komt dan nooit in het geheugen.
+    - Overige formaten: na het decoderen eerst een snelle reduce() met een gehele
+      factor, zodat de LANCZOS-stap daarna op een kleiner beeld werkt.
+
+    Een GespildeFoto wordt rechtstreeks uit zijn bestand gedecodeerd.
+    """
+    img = Image.open(data.pad if isinstance(data, GespildeFoto) else io.BytesIO(data))
+    if doel is not None:
+        orientatie = img.getexif().get(EXIF_ORIENTATIE, 1)
+        # Het doel geldt na draaien; draft/reduce werken op het beeld vóór draaien
+        doel_w, doel_h = (doel[1], doel[0]) if orientatie in _GEDRAAID else doel
+        img.draft(None, (doel_w, doel_h))
+        img.load()
+        factor = min(img.width // doel_w, img.height // doel_h)
+        if factor >= 2:
+            img = img.reduce(factor)
+    img.load()
+    # In place: geen extra kopie van het (al verkleinde) beeld
+    ImageOps.exif_transpose(img, in_place=True)
+    return img
+
+
+def normaliseer_foto(
+    data: bytes,
+    width_emu: int,
+    height_emu: int,
+    ratio_mode: str = "cover",
+    dpi: int | None = None,
+    kwaliteit: int | None = None,
+    max_bytes: int | None = None,
+) -> tuple[bytes, str]:
+    """Crop (cover) en verklein een foto tot de placeholdermaat en geef (bytes, extensie)."""
+    img = decodeer_verkleind(data, doel_pixels(width_emu, height_emu, dpi))
+    return _bereid_beeld(img, width_emu, height_emu, ratio_mode, dpi, kwaliteit, max_bytes)
+
+
+def normaliseer_foto_meervoudig(data: bytes, doelen: tuple[tuple, ...]) -> list[tuple[bytes, str] | None]:
+    """Decodeer een foto één keer en maak alle gevraagde uitsneden (argumenten als _bereid_beeld)."""
+    grootste = None
+    if doelen:
+        maten = [doel_pixels(doel[0], doel[1], doel[3] if len(doel) > 3 else None) for doel in doelen]
+        grootste = (max(w for w, _ in maten), max(h for _, h in maten))
+    img = decodeer_verkleind(data, grootste)
+    uitsneden = []
+    for doel in doelen:
+        try:
+            uitsneden.append(_bereid_beeld(img, *doel))
+        except Exception:
+            uitsneden.append(None)
+    return uitsneden
+
+
+# ---------------------------
+# Procespool voor de CPU-zware voorbereiding
+# ---------------------------
+
+POOL_WORKERS = int(os.getenv("IMAGE_POOL_WORKERS", str(os.cpu_count() or 1)))
+POOL_MIN_TAKEN = int(os.getenv("IMAGE_POOL_MIN_JOBS", "6"))
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+class FotoTaak(NamedTuple):
+    """Eén voorbereidingsopdracht; velden in dezelfde volgorde als normaliseer_foto."""
+    data: bytes
+    width_emu: int
+    height_emu: int
+    ratio_mode: str = "cover"
+    dpi: int | None = None
+    kwaliteit: int | None = None
+    max_bytes: int | None = None
+
+
+class FotoBundel(NamedTuple):
+    """Alle uitsneden van één bronfoto: één decode per bundel."""
+    data: bytes
+    doelen: tuple[tuple, ...]
+
+
+def _verwerk_bundel(bundel: FotoBundel) -> list[tuple[bytes, str] | None]:
+    """Draait in een worker; een onleesbare foto levert None op in plaats van een exceptie."""
+    try:
+        return normaliseer_foto_meervoudig(bundel.data, bundel.doelen)
+    except Exception:
+        return [None] * len(bundel.doelen)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: veilig naast de threads van uvicorn en de downloadpool
+            _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def verwerk_bundels(
+    bundels: list[FotoBundel],
+    forceer_pool: bool = False,
+    forceer_inproces: bool = False,
+) -> list[list[tuple[bytes, str] | None]]:
+    """
+    Voer bundels uit in de procespool (of in-process bij weinig werk); volgorde blijft gelijk.
+    forceer_pool: ook kleine hoeveelheden naar de pool (bijv. per binnenkomende foto).
+    forceer_inproces: nooit naar de pool (bijv. onder cProfile, zodat Pillow in het profiel staat).
+    """
+    if forceer_inproces or POOL_WORKERS <= 1 or (len(bundels) < POOL_MIN_TAKEN and not forceer_pool):
+        return [_verwerk_bundel(b) for b in bundels]
+    try:
+        return list(_get_pool().map(_verwerk_bundel, bundels))
+    except BrokenProcessPool:
+        _reset_pool()
+        return [_verwerk_bundel(b) for b in bundels]
+
+
+# ---------------------------
+# Hergebruik binnen één request
+# ---------------------------
+
+class FotoMemo:
+    """Per-request geheugen van verwerkte foto's.
+
+    Sleutel: (digest van de bronbytes, doelverhouding, doelpixels, instellingen).
+    Dezelfde foto in een even grote placeholder wordt maar één keer gedecodeerd
+    en geëncodeerd; omdat de bytes identiek zijn, hergebruikt python-pptx ook
+    hetzelfde image-part in het pakket.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resultaten: dict[tuple, tuple[bytes, str] | None] = {}
+        self._digests: dict[int, tuple[bytes, str]] = {}
+        self._bestanden: dict[str, bytes] = {}
+        self.verwerkt = 0
+        self.hergebruikt = 0
+
+    def _digest(self, data: bytes | GespildeFoto) -> str:
+        if isinstance(data, GespildeFoto):
+            return data.sha1
+        # De bron-bytes worden vastgehouden, dus id(data) blijft uniek zolang de memo leeft
+        with self._lock:
+            hit = self._digests.get(id(data))
+        if hit is not None and hit[0] is data:
+            return hit[1]
+        digest = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            self._digests[id(data)] = (data, digest)
+        return digest
+
+    def _sleutel(self, taak: FotoTaak) -> tuple:
+        return (
+            self._digest(taak.data),
+            round(int(taak.width_emu) / max(int(taak.height_emu), 1), 4),
+            doel_pixels(taak.width_emu, taak.height_emu, taak.dpi),
+            taak.ratio_mode,
+            taak.kwaliteit,
+            taak.max_bytes,
+        )
+
+    def voeg_toe(self, naam: str, data: bytes | GespildeFoto) -> None:
+        """Registreer bytes die niet van schijf komen (bijv. uit een ZIP, eventueel gespild) onder een naam voor `lees`."""
+        with self._lock:
+            self._bestanden[naam] = data
+
+    def lees(self, pad: str) -> bytes:
+        """Lees een fotobestand één keer per request."""
+        with self._lock:
+            data = self._bestanden.get(pad)
+        if data is None:
+            with open(pad, "rb") as f:
+                data = f.read()
+            with self._lock:
+                data = self._bestanden.setdefault(pad, data)
+        return data
+
+    def bereid_voor(self, taken: list[FotoTaak], forceer_pool: bool = False) -> list[tuple[bytes, str] | None]:
+        """Verwerk alle taken in één keer: per bronfoto één decode, alleen nog onbekende uitsneden."""
+        sleutels = [self._sleutel(t) for t in taken]
+        te_doen: dict[tuple, FotoTaak] = {}
+        with self._lock:
+            for sleutel, taak in zip(sleutels, taken):
+                if sleutel not in self._resultaten and sleutel not in te_doen:
+                    te_doen[sleutel] = taak
+
+        # Groeperen per bron (digest staat vooraan in de sleutel)
+        per_bron: dict[str, tuple[bytes, list[tuple], list[tuple]]] = {}
+        for sleutel, taak in te_doen.items():
+            _, bron_sleutels, doelen = per_bron.setdefault(sleutel[0], (taak.data, [], []))
+            bron_sleutels.append(sleutel)
+            doelen.append(tuple(taak)[1:])
+
+        resultaten = verwerk_bundels(
+            [FotoBundel(data, tuple(doelen)) for data, _, doelen in per_bron.values()],
+            forceer_pool=forceer_pool,
+            forceer_inproces=profiel_actief(),
+        )
+
+        with self._lock:
+            for (_, bron_sleutels, _), uitsneden in zip(per_bron.values(), resultaten):
+                for sleutel, resultaat in zip(bron_sleutels, uitsneden):
+                    self._resultaten[sleutel] = resultaat
+            self.verwerkt += len(per_bron)
+            self.hergebruikt += len(taken) - len(te_doen)
+            return [self._resultaten[s] for s in sleutels]
+
+    def normaliseer(
+        self,
+        data: bytes,
+        width_emu: int,
+        height_emu: int,
+        ratio_mode: str = "cover",
+        dpi: int | None = None,
+        kwaliteit: int | None = None,
+        max_bytes: int | None = None,
+    ) -> tuple[bytes, str]:
+        """Als normaliseer_foto, maar met hergebruik van eerder verwerkte combinaties."""
+        taak = FotoTaak(data, width_emu, height_emu, ratio_mode, dpi, kwaliteit, max_bytes)
+        sleutel = self._sleutel(taak)
+        with self._lock:
+            if sleutel in self._resultaten:
+                self.hergebruikt += 1
+                resultaat = self._resultaten[sleutel]
+                if resultaat is None:
+                    raise ValueError("Foto kon niet worden verwerkt")
+                return resultaat
+
+        resultaat = normaliseer_foto(*taak)
+        with self._lock:
+            self.verwerkt += 1
+            return self._resultaten.setdefault(sleutel, resultaat)
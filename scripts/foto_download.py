@@ -0,0 +1,94 @@
+# scripts/foto_download.py
+# -*- coding: utf-8 -*-
+"""
+Warme Uitvaartassistent — Gelijktijdig ophalen van foto's via een gedeelde HTTP-pool
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from scripts.metrics import PHOTO_BYTES_IN, PHOTO_DOWNLOAD_SECONDS, PHOTOS_FAILED
+
+
+MAX_WORKERS = int(os.getenv("PHOTO_DOWNLOAD_WORKERS", "8"))
+CONNECT_TIMEOUT = float(os.getenv("PHOTO_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("PHOTO_READ_TIMEOUT", "20"))
+POGINGEN = 3
+
+_session: requests.Session | None = None
+_session_lock = threading.Lock()
+
+
+def _get_session() -> requests.Session:
+    """Eén sessie per proces; urllib3 houdt per host een keep-alive pool bij."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=16, pool_maxsize=max(MAX_WORKERS, 1))
+                s.mount("https://", adapter)
+                s.mount("http://", adapter)
+                _session = s
+    return _session
+
+
+def _download_een(url: str, timeout: tuple[float, float], pogingen: int) -> bytes | None:
+    """Download één foto met retries; None als het niet lukt."""
+    t0 = time.perf_counter()
+    data = _download_met_retries(url, timeout, pogingen)
+    PHOTO_DOWNLOAD_SECONDS.observe(time.perf_counter() - t0)
+    if data is None:
+        PHOTOS_FAILED.inc(reason="download")
+    else:
+        PHOTO_BYTES_IN.inc(len(data))
+    return data
+
+
+def _download_met_retries(url: str, timeout: tuple[float, float], pogingen: int) -> bytes | None:
+    for attempt in range(pogingen):
+        try:
+            r = _get_session().get(url, timeout=timeout)
+            if r.status_code == 200:
+                return r.content
+            # 4xx (behalve 429) wordt bij een nieuwe poging niet beter
+            if 400 <= r.status_code < 500 and r.status_code != 429:
+                break
+        except requests.RequestException:
+            pass
+        if attempt < pogingen - 1:
+            time.sleep(0.5 * (2 ** attempt))
+    return None
+
+
+def download_fotos(
+    urls: list[str],
+    max_workers: int | None = None,
+    timeout: tuple[float, float] | None = None,
+    pogingen: int = POGINGEN,
+    verwerk=None,
+) -> dict[str, bytes | None]:
+    """
+    Download alle unieke URL's gelijktijdig; geeft per URL de bytes (of None bij een fout).
+    verwerk: optioneel, draait in dezelfde thread op de bytes van elke gelukte download
+    (ophalen en voorbereiden overlappen dan); het resultaat vervangt de bytes.
+    """
+    uniek = list(dict.fromkeys(urls))
+    if not uniek:
+        return {}
+
+    workers = max(1, min(max_workers or MAX_WORKERS, len(uniek)))
+    timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="foto-download") as pool:
+        def _een(url: str):
+            data = _download_een(url, timeout, pogingen)
+            return verwerk(data) if verwerk is not None and data is not None else data
+
+        resultaten = pool.map(_een, uniek)
+        return dict(zip(uniek, resultaten))
@@ -0,0 +1,96 @@
+# scripts/fotodias.py
+# -*- coding: utf-8 -*-
+"""
+Warme Uitvaartassistent — Veel fotodia's in één keer toevoegen
+
+`prs.slides.add_slide` + `shapes.add_picture` doorlopen bij elke dia het hele
+pakket: de volgende partname (dia én afbeelding), een vrije rId, het volgende
+sldId en een bestaande afbeelding met dezelfde sha1. Bij 500-1000 foto's is dat
+kwadratisch. Hier gebeurt dat één keer vooraf; daarna kost elke dia een vaste
+hoeveelheid werk.
+
+Gebruikt interne python-pptx-API's (_Relationship, rels._rels, _add_pic_from_image_part,
+_add_sldId): afgestemd op python-pptx 1.0.2, de versie in requirements.txt.
+"""
+
+import itertools
+import re
+
+from pptx.opc.constants import RELATIONSHIP_TARGET_MODE as RTM
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.opc.package import _Relationship
+from pptx.opc.packuri import PackURI
+from pptx.parts.image import Image, ImagePart
+from pptx.parts.slide import SlidePart
+
+
+DIA_PARTNAME = "/ppt/slides/slide%d.xml"
+_DIA_NUMMER = re.compile(r"/ppt/slides/slide(\d+)\.xml$")
+_BEELD_NUMMER = re.compile(r"/ppt/media/image(\d+)\.")
+_MAX_SLIDE_ID = 2147483647
+
+
+def lees_afbeelding(data: bytes) -> Image | None:
+    """
+    Content type, extensie en sha1 van een foto (alleen de header wordt gedecodeerd);
+    None als python-pptx er geen afbeelding in herkent.
+    """
+    try:
+        return Image.from_blob(data)
+    except Exception:
+        return None
+
+
+def _vrije_nummers(bezet: set[int]):
+    """Oplopende nummers vanaf 1 die nog niet in `bezet` zitten."""
+    return (n for n in itertools.count(1) if n not in bezet)
+
+
+def _nummers(namen, patroon: re.Pattern) -> set[int]:
+    return {int(m.group(1)) for m in map(patroon.match, namen) if m}
+
+
+def voeg_fotodias_toe(prs, layout, afbeeldingen: list[Image], links: int, boven: int, breedte: int, hoogte: int) -> int:
+    """
+    Voeg per afbeelding (in volgorde) een dia met `layout` toe met de afbeelding op
+    (links, boven, breedte, hoogte). Dezelfde afbeelding wordt één keer opgeslagen.
+    Geeft het aantal toegevoegde dia's.
+    """
+    package = prs.part.package
+    pres_rels = prs.part.rels
+    sld_id_lst = prs.slides._sldIdLst
+
+    # Eén wandeling door het pakket voor alles wat add_slide/add_picture per dia opzoeken
+    partnames = set()
+    per_sha1: dict[str, ImagePart] = {}
+    for part in package.iter_parts():
+        partnames.add(str(part.partname))
+        if isinstance(part, ImagePart):
+            per_sha1.setdefault(part.sha1, part)
+    dia_nummers = _vrije_nummers(_nummers(partnames, _DIA_NUMMER))
+    beeld_nummers = _vrije_nummers(_nummers(partnames, _BEELD_NUMMER))
+    rids = (f"rId{n}" for n in _vrije_nummers({int(r[3:]) for r in pres_rels if r.startswith("rId") and r[3:].isdigit()}))
+    slide_id = max([255] + [int(s.id) for s in sld_id_lst.sldId_lst]) + 1
+
+    for afbeelding in afbeeldingen:
+        slide_part = SlidePart.new(PackURI(DIA_PARTNAME % next(dia_nummers)), package, layout.part)
+        slide = slide_part.slide
+        slide.shapes.clone_layout_placeholders(layout)
+
+        image_part = per_sha1.get(afbeelding.sha1)
+        if image_part is None:
+            partname = PackURI(f"/ppt/media/image{next(beeld_nummers)}.{afbeelding.ext}")
+            image_part = ImagePart(partname, afbeelding.content_type, package, afbeelding.blob, afbeelding.filename)
+            per_sha1[afbeelding.sha1] = image_part
+        image_rid = slide_part.relate_to(image_part, RT.IMAGE)
+        slide.shapes._add_pic_from_image_part(image_part, image_rid, links, boven, breedte, hoogte)
+
+        # Relatie en sldId met vooraf bepaalde nummers (relate_to/add_sldId scannen alles)
+        rid = next(rids)
+        pres_rels._rels[rid] = _Relationship(pres_rels._base_uri, rid, RT.SLIDE, RTM.INTERNAL, slide_part)
+        if slide_id <= _MAX_SLIDE_ID:
+            sld_id_lst._add_sldId(id=slide_id, rId=rid)
+            slide_id += 1
+        else:
+            sld_id_lst.add_sldId(rid)
+    return len(afbeeldingen)
@@ -7,17 +7,26 @@ Warme Uitvaartassistent — Automatische PowerPoint-bouwer met placeholder-herke
 import os
 import re
 import io
-import zipfile
 import tempfile
 import shutil
-import requests
+import threading
+from collections import OrderedDict
+from typing import NamedTuple
 
 from pptx import Presentation
-from pptx.enum.shapes import MSO_SHAPE_TYPE
 from pptx.enum.dml import MSO_FILL
 from pptx.enum.shapes import PP_PLACEHOLDER
-from pptx.util import Emu
-from PIL import Image
+from pptx.oxml.ns import qn
+from pptx.shapes.group import GroupShape
+
+from scripts.foto_download import download_fotos, POGINGEN
+from scripts.beeldverwerking import normaliseer_foto, FotoMemo, FotoTaak, VOORBEELD_DPI, VOORBEELD_KWALITEIT
+# Bewust opnieuw geëxporteerd: de crophelpers stonden vroeger in deze module
+from scripts.beeldverwerking import _compute_contain_size, _crop_to_ratio  # noqa: F401
+from scripts.profilering import profileer
+from scripts.schijfbuffer import FotoBuffer
+from scripts.zip_invoer import lees_fotos_uit_zips
+from scripts.ooxml_schrijver import BronLid, indexeer_zip, sla_pakket_op
 
 
 # ---------------------------
@@ -35,107 +44,96 @@ def verzamel_fotobestanden(uploadmap: str) -> list[str]:
 
 
 def download_base44_fotos(foto_urls: list[str], tmp_dir: str) -> list[str]:
-    """Download Base44-foto's met retries en foutafhandeling."""
-    import time
+    """Download Base44-foto's gelijktijdig (met retries) en bewaar ze in tmp_dir."""
+    resultaten = download_fotos(foto_urls)
     paden = []
 
     for i, url in enumerate(foto_urls, start=1):
-        success = False
-        for attempt in range(3):
-            try:
-                r = requests.get(url, timeout=15)
-                if r.status_code == 200:
-                    ext = ".jpg"
-                    ct = r.headers.get("Content-Type", "")
-                    if "png" in ct.lower():
-                        ext = ".png"
-                    pad = os.path.join(tmp_dir, f"base44_foto_{i}{ext}")
-                    with open(pad, "wb") as f:
-                        f.write(r.content)
-                    paden.append(pad)
-                    success = True
-                    break
-            except Exception:
-                pass
-            time.sleep(1)
-        if not success:
-            print(f"⚠️ Kon foto {i} niet downloaden na 3 pogingen.")
+        data = resultaten.get(url)
+        if not data:
+            print(f"⚠️ Kon foto {i} niet downloaden na {POGINGEN} pogingen.")
+            continue
+        ext = ".png" if data[:8] == b"\x89PNG\r\n\x1a\n" else ".jpg"
+        pad = os.path.join(tmp_dir, f"base44_foto_{i}{ext}")
+        with open(pad, "wb") as f:
+            f.write(data)
+        paden.append(pad)
     return paden
 
 
-# ---------------------------
-# Beeldverwerking
-# ---------------------------
-
-def _compute_contain_size(img_w: int, img_h: int, box_w_emu: Emu, box_h_emu: Emu) -> tuple[int, int]:
-    """Bereken contain (fit) afmetingen."""
-    box_w = int(box_w_emu)
-    box_h = int(box_h_emu)
-    r = min(box_w / img_w, box_h / img_h)
-    return max(1, int(img_w * r)), max(1, int(img_h * r))
-
-
-def _crop_to_ratio(img: Image.Image, target_w_emu: Emu, target_h_emu: Emu) -> Image.Image:
-    """Crop de afbeelding zodat hij de shape volledig vult (cover)."""
-    img_w, img_h = img.size
-    target_ratio = float(target_w_emu) / float(target_h_emu)
-    img_ratio = img_w / img_h
-
-    if img_ratio > target_ratio:
-        new_w = int(target_ratio * img_h)
-        x0 = (img_w - new_w) // 2
-        return img.crop((x0, 0, x0 + new_w, img_h))
-    else:
-        new_h = int(img_w / target_ratio)
-        y0 = (img_h - new_h) // 2
-        return img.crop((0, y0, img_w, y0 + new_h))
-
-
 # ---------------------------
 # Placeholder-detectie en vervanging
 # ---------------------------
 
 _PLACEHOLDER_RE = re.compile(r"^foto[_\-]?(\d+)$", re.IGNORECASE)
 
+class ShapeRecord(NamedTuple):
+    """Eén shape met de dia waarop hij staat (diepte > 0: binnen een groep)."""
+    slide_index: int
+    slide: object
+    shape: object
+    diepte: int
+
+
+def _walk_shapes(container):
+    """Diepte-eerst door alle shapes, inclusief groepen, met een expliciete stapel."""
+    stapel = [(iter(container.shapes), 0)]
+    while stapel:
+        it, diepte = stapel[-1]
+        sh = next(it, None)
+        if sh is None:
+            stapel.pop()
+            continue
+        yield sh, diepte
+        if isinstance(sh, GroupShape):
+            stapel.append((iter(sh.shapes), diepte + 1))
+
+
 def _iter_all_shapes_recursive(container):
     """Itereer alle shapes, inclusief groepen."""
-    for sh in container.shapes:
+    for sh, _ in _walk_shapes(container):
         yield sh
-        if sh.shape_type == MSO_SHAPE_TYPE.GROUP:
-            for inner in _iter_all_shapes_recursive(sh):
-                yield inner
 
 
-def _collect_named_placeholders(prs: Presentation) -> list[tuple[int, object]]:
-    """Zoek alle shapes met naam foto_x."""
+def indexeer_shapes(prs: Presentation) -> list[ShapeRecord]:
+    """Eén doorloop over alle dia's: elke shape samen met zijn dia."""
+    return [
+        ShapeRecord(slide_index, slide, sh, diepte)
+        for slide_index, slide in enumerate(prs.slides)
+        for sh, diepte in _walk_shapes(slide)
+    ]
+
+
+def _collect_named_placeholders(prs: Presentation, index: list[ShapeRecord] | None = None) -> list[tuple[int, ShapeRecord]]:
+    """Zoek alle shapes met naam foto_x, gesorteerd op nummer."""
     matches = []
-    for slide in prs.slides:
-        for sh in _iter_all_shapes_recursive(slide):
-            nm = getattr(sh, "name", None)
-            if not nm:
-                continue
-            m = _PLACEHOLDER_RE.match(nm)
-            if m:
-                idx = int(m.group(1))
-                matches.append((idx, sh))
+    for rec in index if index is not None else indexeer_shapes(prs):
+        nm = getattr(rec.shape, "name", None)
+        if not nm:
+            continue
+        m = _PLACEHOLDER_RE.match(nm)
+        if m:
+            matches.append((int(m.group(1)), rec))
     matches.sort(key=lambda t: t[0])
     return matches
 
 
-def _replace_shape_with_picture(slide, shape, image_path: str, ratio_mode: str = "cover"):
-    """Vervang de visuele inhoud van een shape door een foto."""
+def direct_op_dia(shape) -> bool:
+    """
+    True als de shape niet in een groep zit. Alleen die worden vervangen: left/top/width/height
+    van een groepslid staan in het coördinatenstelsel van de groep, niet van de dia.
+    """
+    return shape._element.getparent().tag == qn("p:spTree")
+
+
+def _plaats_foto(slide, shape, encoded: bytes):
+    """Zet al voorbereide fotobytes in de shape (goedkoop, blijft in het hoofdproces)."""
     left, top, width, height = shape.left, shape.top, shape.width, shape.height
 
     if getattr(shape, "is_placeholder", False):
         try:
             if shape.placeholder_format.type == PP_PLACEHOLDER.PICTURE:
-                with Image.open(image_path) as im:
-                    cropped = _crop_to_ratio(im, width, height)
-                    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tf:
-                        cropped.save(tf.name)
-                        tmp = tf.name
-                shape.insert_picture(tmp)
-                os.remove(tmp)
+                shape.insert_picture(io.BytesIO(encoded))
                 return
         except Exception:
             pass
@@ -145,18 +143,38 @@ def _replace_shape_with_picture(slide, shape, image_path: str, ratio_mode: str =
     except Exception:
         pass
 
-    with Image.open(image_path) as im:
-        cropped = _crop_to_ratio(im, width, height)
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tf:
-            cropped.save(tf.name)
-            tmp = tf.name
-    slide.shapes.add_picture(tmp, left, top, width=width, height=height)
-    os.remove(tmp)
+    slide.shapes.add_picture(io.BytesIO(encoded), left, top, width=width, height=height)
+
+
+def _replace_shape_with_picture(slide, shape, image_path: str, ratio_mode: str = "cover", memo: FotoMemo | None = None):
+    """Vervang de visuele inhoud van een shape door een foto (volledig in het geheugen)."""
+    if memo is not None:
+        encoded, _ext = memo.normaliseer(memo.lees(image_path), shape.width, shape.height)
+    else:
+        with open(image_path, "rb") as f:
+            encoded, _ext = normaliseer_foto(f.read(), shape.width, shape.height)
+    _plaats_foto(slide, shape, encoded)
 
 
-def vervang_placeholder_fotos(prs: Presentation, fotopaden: list[str], ratio_mode: str = "cover", repeat_if_insufficient: bool = True) -> int:
-    """Vervang alle placeholders in het sjabloon."""
-    placeholders = _collect_named_placeholders(prs)
+def vervang_placeholder_fotos(
+    prs: Presentation,
+    fotopaden: list[str],
+    ratio_mode: str = "cover",
+    repeat_if_insufficient: bool = True,
+    manifest: "tuple[PlaceholderInfo, ...] | None" = None,
+    memo: FotoMemo | None = None,
+    dpi: int | None = None,
+    kwaliteit: int | None = None,
+) -> int:
+    """
+    Vervang alle placeholders in het sjabloon (via het manifest als dat is meegegeven).
+    Namen in fotopaden die al in de memo staan (`FotoMemo.voeg_toe`) worden niet van schijf gelezen.
+    dpi/kwaliteit: zoals bij normaliseer_foto (bijv. lager voor een voorbeeld).
+    """
+    if manifest is not None:
+        placeholders = zoek_placeholders(prs, manifest)
+    else:
+        placeholders = [(rec.slide, rec.shape) for _, rec in _collect_named_placeholders(prs)]
     if not placeholders:
         print("Geen placeholders met naam foto_x gevonden in sjabloon.")
         return 0
@@ -166,27 +184,180 @@ def vervang_placeholder_fotos(prs: Presentation, fotopaden: list[str], ratio_mod
         return 0
 
     totaal_fotos = len(fotopaden)
-    vervangen = 0
+    memo = memo or FotoMemo()
 
-    for i, (_, shape) in enumerate(placeholders):
+    # 1) Plan: welke foto in welke shape (volgorde van foto_N). Een foto_N in een groep
+    # telt mee in de volgorde maar blijft staan, net als vroeger.
+    plan = []
+    for i, (slide, shape) in enumerate(placeholders):
+        if not direct_op_dia(shape):
+            continue
         foto_pad = fotopaden[i % totaal_fotos] if repeat_if_insufficient else fotopaden[i] if i < totaal_fotos else None
         if not foto_pad:
             continue
+        plan.append((slide, shape, foto_pad))
 
-        slide = None
-        for s in prs.slides:
-            if shape in s.shapes:
-                slide = s
-                break
+    # 2) Voorbereiden (decode/crop/encode), zo nodig in de procespool
+    taken = [FotoTaak(memo.lees(pad), shape.width, shape.height, dpi=dpi, kwaliteit=kwaliteit) for _, shape, pad in plan]
+    voorbereid = memo.bereid_voor(taken)
 
-        if slide:
-            _replace_shape_with_picture(slide, shape, foto_pad, ratio_mode)
-            vervangen += 1
+    # 3) Invoegen in het hoofdproces
+    vervangen = 0
+    for (slide, shape, pad), resultaat in zip(plan, voorbereid):
+        if resultaat is None:
+            print(f"⚠️ Foto kon niet worden verwerkt: {os.path.basename(pad)}")
+            continue
+        _plaats_foto(slide, shape, resultaat[0])
+        vervangen += 1
 
-    print(f"In totaal {vervangen} placeholders vervangen.")
+    print(f"In totaal {vervangen} placeholders vervangen ({memo.verwerkt} foto's verwerkt, {memo.hergebruikt} hergebruikt).")
     return vervangen
 
 
+# ---------------------------
+# Gecompileerde sjablonen (proces-cache)
+# ---------------------------
+
+MAX_GECOMPILEERDE_SJABLONEN = int(os.getenv("COMPILED_TEMPLATE_CACHE_SIZE", "8"))
+
+
+class PlaceholderInfo(NamedTuple):
+    """Vooraf berekende plek van een foto-placeholder in het sjabloon."""
+    slide_index: int
+    shape_id: int
+    naam: str
+    left: int
+    top: int
+    width: int
+    height: int
+    ratio: float
+
+
+class GecompileerdSjabloon(NamedTuple):
+    """Ruwe sjabloonbytes plus de geordende placeholder-manifesten."""
+    sleutel: str
+    versie: object
+    blob: bytes
+    picture_placeholders: tuple[PlaceholderInfo, ...]
+    foto_placeholders: tuple[PlaceholderInfo, ...]
+    zip_index: dict[str, BronLid]
+
+
+_sjabloon_cache: "OrderedDict[str, GecompileerdSjabloon]" = OrderedDict()
+_sjabloon_cache_lock = threading.Lock()
+
+
+def _is_picture_placeholder(sh) -> bool:
+    try:
+        return sh.is_placeholder and sh.placeholder_format.type == PP_PLACEHOLDER.PICTURE
+    except Exception:
+        return False
+
+
+def _ph_order_key(sh):
+    """Volgorde binnen een dia: eerst 'foto N' op nummer, daarna van boven naar beneden."""
+    name = getattr(sh, "name", "") or ""
+    m = re.search(r"foto\s*0*(\d+)", name, re.IGNORECASE)
+    if m:
+        return (0, int(m.group(1)))
+    return (1, int(sh.top), int(sh.left))
+
+
+def _placeholder_info(slide_index: int, sh) -> PlaceholderInfo:
+    left, top, width, height = (int(v or 0) for v in (sh.left, sh.top, sh.width, sh.height))
+    return PlaceholderInfo(
+        slide_index=slide_index,
+        shape_id=sh.shape_id,
+        naam=getattr(sh, "name", "") or "",
+        left=left,
+        top=top,
+        width=width,
+        height=height,
+        ratio=(width / height) if height else 1.0,
+    )
+
+
+def compileer_sjabloon(sleutel: str, versie: object, blob: bytes) -> GecompileerdSjabloon:
+    """Parse het sjabloon één keer en leg alle foto-placeholders in volgorde vast."""
+    prs = Presentation(io.BytesIO(blob))
+    index = indexeer_shapes(prs)
+
+    # PICTURE-placeholders direct op de dia, per dia gesorteerd
+    per_slide: dict[int, list] = {}
+    for rec in index:
+        if rec.diepte == 0 and _is_picture_placeholder(rec.shape):
+            per_slide.setdefault(rec.slide_index, []).append(rec.shape)
+    picture: list[PlaceholderInfo] = []
+    for slide_index in sorted(per_slide):
+        image_shapes = sorted(per_slide[slide_index], key=_ph_order_key)
+        picture.extend(_placeholder_info(slide_index, sh) for sh in image_shapes)
+
+    # Shapes met naam foto_N (ook in groepen, voor de volgorde), gesorteerd op N
+    named = [(nummer, _placeholder_info(rec.slide_index, rec.shape)) for nummer, rec in _collect_named_placeholders(prs, index)]
+    return GecompileerdSjabloon(
+        sleutel=sleutel,
+        versie=versie,
+        blob=blob,
+        picture_placeholders=tuple(picture),
+        foto_placeholders=tuple(info for _, info in named),
+        zip_index=indexeer_zip(blob, prs),
+    )
+
+
+def laad_gecompileerd_sjabloon(pad: str, sleutel: str | None = None, versie: object = None) -> GecompileerdSjabloon:
+    """Haal een gecompileerd sjabloon uit de proces-cache; een nieuwe versie vervangt de oude."""
+    sleutel = sleutel or os.path.abspath(pad)
+    if versie is None:
+        st = os.stat(pad)
+        versie = (st.st_mtime_ns, st.st_size)
+
+    with _sjabloon_cache_lock:
+        entry = _sjabloon_cache.get(sleutel)
+        if entry is not None and entry.versie == versie:
+            _sjabloon_cache.move_to_end(sleutel)
+            return entry
+
+    with open(pad, "rb") as f:
+        blob = f.read()
+    entry = compileer_sjabloon(sleutel, versie, blob)
+
+    with _sjabloon_cache_lock:
+        _sjabloon_cache[sleutel] = entry
+        _sjabloon_cache.move_to_end(sleutel)
+        while len(_sjabloon_cache) > MAX_GECOMPILEERDE_SJABLONEN:
+            _sjabloon_cache.popitem(last=False)
+    return entry
+
+
+def kloon_presentatie(sjabloon: GecompileerdSjabloon) -> Presentation:
+    """Nieuwe, zelfstandige Presentation uit de gecachte bytes (geen schijf, geen GCS)."""
+    return Presentation(io.BytesIO(sjabloon.blob))
+
+
+def zoek_placeholders(prs: Presentation, manifest: tuple[PlaceholderInfo, ...]) -> list[tuple[object, object]]:
+    """Zet manifest-regels om naar (slide, shape)-paren in een gekloonde presentatie."""
+    slides = list(prs.slides)
+    per_slide: dict[int, tuple[object, dict[int, object]]] = {}
+    paren = []
+    for info in manifest:
+        if info.slide_index not in per_slide:
+            slide = slides[info.slide_index]
+            per_slide[info.slide_index] = (slide, {sh.shape_id: sh for sh in _iter_all_shapes_recursive(slide)})
+        slide, shapes = per_slide[info.slide_index]
+        sh = shapes.get(info.shape_id)
+        if sh is not None:
+            paren.append((slide, sh))
+    return paren
+
+
+def beperk_dias(prs: Presentation, aantal: int) -> None:
+    """Houd alleen de eerste `aantal` dia's over (de rest wordt niet meer opgeslagen)."""
+    sld_ids = prs.slides._sldIdLst
+    for sld_id in list(sld_ids)[aantal:]:
+        prs.part.drop_rel(sld_id.rId)
+        sld_ids.remove(sld_id)
+
+
 # ---------------------------
 # Titel-dia
 # ---------------------------
@@ -237,31 +408,64 @@ def maak_presentatie_automatisch(
     titel_naam: str | None = None,
     titel_datums: str | None = None,
     titel_bijzin: str | None = None,
-    repeat_if_insufficient: bool = True
+    repeat_if_insufficient: bool = True,
+    profiel: bool = False,
+    voorbeeld: bool = False,
+    voorbeeld_dias: int | None = None,
 ) -> str:
-    """Bouw de presentatie en retourneer het pad naar het .pptx-bestand."""
+    """
+    Bouw de presentatie en retourneer het pad naar het .pptx-bestand.
+    Met profiel=True draait de bouw onder cProfile en komt er een pstats-dump
+    naast de uitvoer (<uitvoer>.prof).
+    Met voorbeeld=True worden de foto's op VOORBEELD_DPI/VOORBEELD_KWALITEIT gezet
+    (uitvoer voorbeeld_<uitvoer_pad>); met voorbeeld_dias alleen de eerste N dia's,
+    en worden alleen de foto's gedownload die daarin passen.
+    """
+    if profiel:
+        with profileer() as p:
+            output_path = maak_presentatie_automatisch(
+                sjabloon_pad, base44_foto_urls, upload_bestanden, uitvoer_pad, ratio_mode,
+                titel_naam, titel_datums, titel_bijzin, repeat_if_insufficient,
+                voorbeeld=voorbeeld, voorbeeld_dias=voorbeeld_dias,
+            )
+        print(f"⏱️ Profiel opgeslagen: {p.schrijf(output_path + '.prof')}")
+        return output_path
+
     if not os.path.exists(sjabloon_pad):
         raise FileNotFoundError(f"Sjabloon niet gevonden: {sjabloon_pad}")
 
     if not base44_foto_urls and not upload_bestanden:
         raise ValueError("Geen invoer: geef base44_foto_urls of upload_bestanden op.")
 
+    if voorbeeld_dias is not None and voorbeeld_dias < 1:
+        raise ValueError("voorbeeld_dias moet minimaal 1 zijn.")
+
     tmp_dir = tempfile.mkdtemp(prefix="presentatie_")
     print(f"Tijdelijke map aangemaakt: {tmp_dir}")
 
     fotopaden: list[str] = []
+    memo = FotoMemo()
 
     try:
+        sjabloon = laad_gecompileerd_sjabloon(sjabloon_pad)
+        manifest = sjabloon.foto_placeholders
+        if voorbeeld:
+            if voorbeeld_dias is not None:
+                manifest = tuple(info for info in manifest if info.slide_index < voorbeeld_dias)
+            # Meer foto's dan placeholders worden niet gebruikt: niet downloaden
+            base44_foto_urls = (base44_foto_urls or [])[:max(1, len(manifest))]
+
         if base44_foto_urls:
             fotopaden = download_base44_fotos(base44_foto_urls, tmp_dir)
 
         if upload_bestanden and not fotopaden:
             zip_bestanden = [f for f in upload_bestanden if f.lower().endswith(".zip")]
             if zip_bestanden:
-                for zip_pad in zip_bestanden:
-                    with zipfile.ZipFile(zip_pad, "r") as zip_ref:
-                        zip_ref.extractall(tmp_dir)
-                fotopaden = verzamel_fotobestanden(tmp_dir)
+                # ✅ Foto's direct uit het archief lezen, zonder uitpakken naar schijf;
+                # boven SPILL_PHOTO_BYTES gaan ze naar tijdelijke bestanden
+                for naam, data in lees_fotos_uit_zips(zip_bestanden, verwerk=FotoBuffer().bewaar):
+                    memo.voeg_toe(naam, data)
+                    fotopaden.append(naam)
             else:
                 for f in upload_bestanden:
                     if f.lower().endswith((".jpg", ".jpeg", ".png")):
@@ -272,17 +476,28 @@ def maak_presentatie_automatisch(
         if not fotopaden:
             raise ValueError("Geen geldige foto's gevonden om te verwerken.")
 
-        prs = Presentation(sjabloon_pad)
+        prs = kloon_presentatie(sjabloon)
         if titel_naam:
             zet_titel_dia(prs, titel_naam, titel_datums, titel_bijzin)
-
-        vervang_placeholder_fotos(prs, fotopaden, ratio_mode=ratio_mode, repeat_if_insufficient=repeat_if_insufficient)
+        if voorbeeld and voorbeeld_dias is not None:
+            beperk_dias(prs, voorbeeld_dias)
+
+        vervang_placeholder_fotos(
+            prs,
+            fotopaden,
+            ratio_mode=ratio_mode,
+            repeat_if_insufficient=repeat_if_insufficient,
+            manifest=manifest,
+            memo=memo,
+            dpi=VOORBEELD_DPI if voorbeeld else None,
+            kwaliteit=VOORBEELD_KWALITEIT if voorbeeld else None,
+        )
 
         OUTPUT_DIR = "/app/output"
         os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-        output_path = os.path.join(OUTPUT_DIR, uitvoer_pad)
-        prs.save(output_path)
+        output_path = os.path.join(OUTPUT_DIR, f"voorbeeld_{uitvoer_pad}" if voorbeeld else uitvoer_pad)
+        sla_pakket_op(prs, output_path, sjabloon.blob, sjabloon.zip_index)
 
         return output_path
 
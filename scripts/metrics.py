@@ -0,0 +1,171 @@
+# scripts/metrics.py
+# -*- coding: utf-8 -*-
+"""
+Warme Uitvaartassistent — Lichte meetlaag: Prometheus-histogrammen/tellers en tijden per request
+
+De metrics worden in het Prometheus-tekstformaat gerenderd (GET /metrics),
+zonder extra afhankelijkheid. Per request verzamelt `meet_request()` de duur
+van elke stap, voor een Server-Timing-header of een veld in het antwoord.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+STANDAARD_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_registry: list["_Metric"] = []
+
+
+def _labels_tekst(labelnames: tuple[str, ...], waarden: tuple[str, ...], extra: str = "") -> str:
+    delen = ['%s="%s"' % (n, str(v).replace('"', "'")) for n, v in zip(labelnames, waarden)]
+    if extra:
+        delen.append(extra)
+    return "{" + ",".join(delen) + "}" if delen else ""
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, naam: str, uitleg: str, labelnames: tuple[str, ...] = ()):
+        self.naam = naam
+        self.uitleg = uitleg
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _sleutel(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.naam} {self.uitleg}", f"# TYPE {self.naam} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def __init__(self, naam, uitleg, labelnames=()):
+        super().__init__(naam, uitleg, labelnames)
+        self._waarden: dict[tuple[str, ...], float] = {}
+
+    def inc(self, waarde: float = 1.0, **labels) -> None:
+        sleutel = self._sleutel(labels)
+        with self._lock:
+            self._waarden[sleutel] = self._waarden.get(sleutel, 0.0) + waarde
+
+    def render(self) -> list[str]:
+        regels = super().render()
+        with self._lock:
+            for sleutel, waarde in sorted(self._waarden.items()):
+                regels.append(f"{self.naam}{_labels_tekst(self.labelnames, sleutel)} {waarde}")
+        return regels
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, naam, uitleg, labelnames=(), buckets=STANDAARD_BUCKETS):
+        super().__init__(naam, uitleg, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._reeksen: dict[tuple[str, ...], list] = {}
+
+    def observe(self, waarde: float, **labels) -> None:
+        sleutel = self._sleutel(labels)
+        with self._lock:
+            reeks = self._reeksen.get(sleutel)
+            if reeks is None:
+                # [tellingen per bucket..., som, aantal]
+                reeks = self._reeksen[sleutel] = [0] * len(self.buckets) + [0.0, 0]
+            for i, grens in enumerate(self.buckets):
+                if waarde <= grens:
+                    reeks[i] += 1
+            reeks[-2] += waarde
+            reeks[-1] += 1
+
+    def render(self) -> list[str]:
+        regels = super().render()
+        with self._lock:
+            for sleutel, reeks in sorted(self._reeksen.items()):
+                for grens, aantal in zip(self.buckets, reeks):
+                    le = 'le="%s"' % grens
+                    regels.append(f"{self.naam}_bucket{_labels_tekst(self.labelnames, sleutel, le)} {aantal}")
+                le = 'le="+Inf"'
+                regels.append(f"{self.naam}_bucket{_labels_tekst(self.labelnames, sleutel, le)} {reeks[-1]}")
+                regels.append(f"{self.naam}_sum{_labels_tekst(self.labelnames, sleutel)} {reeks[-2]}")
+                regels.append(f"{self.naam}_count{_labels_tekst(self.labelnames, sleutel)} {reeks[-1]}")
+        return regels
+
+
+def render_metrics() -> str:
+    """Alle metrics in het Prometheus-tekstformaat (versie 0.0.4)."""
+    regels = []
+    for metric in _registry:
+        regels.extend(metric.render())
+    return "\n".join(regels) + "\n"
+
+
+# ---------------------------
+# Metrics van de presentatiebouw
+# ---------------------------
+
+STAGE_SECONDS = Histogram("deck_stage_seconds", "Duur per stap van de presentatiebouw", ("stage",))
+PHOTO_DOWNLOAD_SECONDS = Histogram("photo_download_seconds", "Duur per fotodownload (incl. retries)")
+PHOTO_BYTES_IN = Counter("photo_bytes_in_total", "Gedownloade fotobytes")
+DECK_BYTES_OUT = Counter("deck_bytes_out_total", "Bytes van opgeslagen presentaties")
+PHOTOS_FAILED = Counter("photos_failed_total", "Foto's die niet geplaatst konden worden", ("reason",))
+DECKS_TOTAL = Counter("decks_generated_total", "Gegenereerde presentaties")
+
+
+# ---------------------------
+# Tijden per request
+# ---------------------------
+
+class StapTijden:
+    """Duur per stap binnen één request (parallelle stappen tellen op)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stappen: dict[str, float] = {}
+
+    def voeg_toe(self, stap: str, seconden: float) -> None:
+        with self._lock:
+            self.stappen[stap] = self.stappen.get(stap, 0.0) + seconden
+
+    def als_ms(self) -> dict[str, float]:
+        with self._lock:
+            return {stap: round(s * 1000, 1) for stap, s in self.stappen.items()}
+
+
+_huidige: ContextVar[StapTijden | None] = ContextVar("stap_tijden", default=None)
+
+
+@contextmanager
+def meet_request():
+    """Verzamel de stappen van dit request (ook in threads die de context meekrijgen)."""
+    tijden = StapTijden()
+    token = _huidige.set(tijden)
+    try:
+        yield tijden
+    finally:
+        _huidige.reset(token)
+
+
+@contextmanager
+def stap(naam: str):
+    """Meet een stap: in het histogram en, als er een request loopt, in diens tijden."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        duur = time.perf_counter() - t0
+        STAGE_SECONDS.observe(duur, stage=naam)
+        tijden = _huidige.get()
+        if tijden is not None:
+            tijden.voeg_toe(naam, duur)
+
+
+def server_timing(tijden_ms: dict[str, float]) -> str:
+    """Waarde voor de Server-Timing-header."""
+    return ", ".join(f"{naam};dur={ms}" for naam, ms in tijden_ms.items())
@@ -0,0 +1,203 @@
+# scripts/ooxml_schrijver.py
+# -*- coding: utf-8 -*-
+"""
+Warme Uitvaartassistent — .pptx opslaan op ZIP-niveau
+
+`prs.save()` pakt elk onderdeel opnieuw in, ook de achtergronden en fonts van
+het sjabloon die we nooit aanraken. Deze schrijver gebruikt dezelfde
+python-pptx PackageWriter (content types, relaties, onderdelen), maar schrijft
+zelf de ZIP:
+
+- onderdelen die byte-voor-byte gelijk zijn aan het sjabloon (zelfde grootte en
+  CRC) worden met hun gecomprimeerde bytes rechtstreeks gekopieerd;
+- al gecomprimeerde media (JPEG, PNG, ...) worden opgeslagen zonder deflate;
+- de rest (gewijzigde dia-XML, relaties, content types) wordt gedeflate.
+"""
+
+import io
+import os
+import struct
+import time
+import zlib
+import zipfile
+from typing import NamedTuple
+
+from pptx.opc.packuri import PACKAGE_URI
+from pptx.opc.serialized import PackageWriter
+
+
+MEDIA_ZONDER_DEFLATE = (".jpg", ".jpeg", ".jpe", ".png", ".gif", ".wdp", ".mp3", ".m4a", ".mp4", ".m4v", ".mov")
+
+_LOKALE_KOP = struct.Struct("<4s2B4HL2L2H")
+_CENTRALE_KOP = struct.Struct("<4s4B4HL2L5H2L")
+_EINDE = struct.Struct("<4s4H2LH")
+_MAX32 = 0xFFFFFFFF
+_VERSIE = 20  # 2.0: deflate, geen zip64
+_UTF8_VLAG = 0x800
+
+
+class BronLid(NamedTuple):
+    """Een ZIP-lid van het sjabloon, met de positie van de gecomprimeerde bytes."""
+    crc: int
+    grootte: int
+    methode: int
+    gecomprimeerd: int
+    data_offset: int
+    datum_tijd: tuple
+    # CRC/grootte zoals python-pptx het ongewijzigde onderdeel opnieuw serialiseert
+    pptx_crc: int | None = None
+    pptx_grootte: int | None = None
+
+    def gelijk_aan(self, crc: int, grootte: int) -> bool:
+        return (self.crc, self.grootte) == (crc, grootte) or (self.pptx_crc, self.pptx_grootte) == (crc, grootte)
+
+
+def indexeer_zip(blob: bytes, prs=None) -> dict[str, BronLid]:
+    """
+    Index van alle leden van een ZIP in het geheugen (membername -> BronLid).
+    Met `prs` (vers geladen uit dezelfde bytes) wordt ook vastgelegd hoe python-pptx
+    elk onderdeel serialiseert: XML die niet gewijzigd is, herkennen we daaraan.
+    """
+    leden = {}
+    with zipfile.ZipFile(io.BytesIO(blob)) as zf:
+        for info in zf.infolist():
+            if info.flag_bits & 0x1 or info.compress_type not in (zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED):
+                continue
+            kop = blob[info.header_offset:info.header_offset + _LOKALE_KOP.size]
+            naam_len, extra_len = struct.unpack("<2H", kop[26:30])
+            leden[info.filename] = BronLid(
+                info.CRC,
+                info.file_size,
+                info.compress_type,
+                info.compress_size,
+                info.header_offset + _LOKALE_KOP.size + naam_len + extra_len,
+                info.date_time,
+            )
+    if prs is not None:
+        package = prs.part.package
+        geserialiseerd = [(PACKAGE_URI.rels_uri, package._rels.xml)]
+        for part in package.iter_parts():
+            geserialiseerd.append((part.partname, part.blob))
+            if part._rels:
+                geserialiseerd.append((part.partname.rels_uri, part.rels.xml))
+        for uri, data in geserialiseerd:
+            lid = leden.get(uri.membername)
+            if lid is not None:
+                leden[uri.membername] = lid._replace(pptx_crc=zlib.crc32(data), pptx_grootte=len(data))
+    return leden
+
+
+def _dos_tijd(datum_tijd: tuple) -> tuple[int, int]:
+    jaar, maand, dag, uur, minuut, seconde = datum_tijd[:6]
+    datum = (max(jaar, 1980) - 1980) << 9 | maand << 5 | dag
+    tijd = uur << 11 | minuut << 5 | seconde // 2
+    return tijd, datum
+
+
+class _ZipTeGroot(Exception):
+    """Zip64 nodig; valt terug op prs.save()."""
+
+
+class _ZipSchrijver:
+    """Minimale ZIP-schrijver (geen zip64) met ruw kopiëren van bestaande leden."""
+
+    def __init__(self, f, bron: bytes | None, bron_index: dict[str, BronLid] | None):
+        self._f = f
+        self._start = f.tell()
+        self._bron = memoryview(bron) if bron is not None else None
+        self._bron_index = bron_index or {}
+        self._centraal: list[bytes] = []
+        self._nu = _dos_tijd(time.localtime()[:6])
+        self.telling = {"gekopieerd": 0, "opgeslagen": 0, "gedeflate": 0}
+
+    def _positie(self) -> int:
+        return self._f.tell() - self._start
+
+    def _schrijf_lid(self, naam: str, methode: int, crc: int, grootte: int, data, dos_tijd: tuple[int, int]) -> None:
+        naam_bytes = naam.encode("utf-8")
+        vlaggen = 0 if naam.isascii() else _UTF8_VLAG
+        offset = self._positie()
+        if offset > _MAX32 or grootte > _MAX32 or len(data) > _MAX32 or len(self._centraal) >= 0xFFFF:
+            raise _ZipTeGroot(naam)
+        tijd, datum = dos_tijd
+        self._f.write(_LOKALE_KOP.pack(
+            b"PK\x03\x04", _VERSIE, 0, vlaggen, methode, tijd, datum,
+            crc, len(data), grootte, len(naam_bytes), 0,
+        ))
+        self._f.write(naam_bytes)
+        self._f.write(data)
+        self._centraal.append(_CENTRALE_KOP.pack(
+            b"PK\x01\x02", _VERSIE, 3, _VERSIE, 0, vlaggen, methode, tijd, datum,
+            crc, len(data), grootte, len(naam_bytes), 0, 0, 0, 0, 0o600 << 16, offset,
+        ) + naam_bytes)
+
+    def write(self, pack_uri, blob: bytes) -> None:
+        """Zelfde interface als de fysieke writer van python-pptx."""
+        naam = pack_uri.membername
+        crc = zlib.crc32(blob)
+
+        bron = self._bron_index.get(naam)
+        if bron is not None and bron.gelijk_aan(crc, len(blob)):
+            # Ongewijzigd: de oorspronkelijke (gecomprimeerde) bytes van het sjabloon
+            ruw = self._bron[bron.data_offset:bron.data_offset + bron.gecomprimeerd]
+            self._schrijf_lid(naam, bron.methode, bron.crc, bron.grootte, ruw, _dos_tijd(bron.datum_tijd))
+            self.telling["gekopieerd"] += 1
+        elif naam.lower().endswith(MEDIA_ZONDER_DEFLATE):
+            self._schrijf_lid(naam, zipfile.ZIP_STORED, crc, len(blob), blob, self._nu)
+            self.telling["opgeslagen"] += 1
+        else:
+            comp = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED, -15)
+            data = comp.compress(blob) + comp.flush()
+            self._schrijf_lid(naam, zipfile.ZIP_DEFLATED, crc, len(blob), data, self._nu)
+            self.telling["gedeflate"] += 1
+
+    def sluit(self) -> None:
+        cd_offset = self._positie()
+        for regel in self._centraal:
+            self._f.write(regel)
+        cd_grootte = self._positie() - cd_offset
+        if cd_offset > _MAX32:
+            raise _ZipTeGroot("centrale directory")
+        self._f.write(_EINDE.pack(b"PK\x05\x06", 0, 0, len(self._centraal), len(self._centraal), cd_grootte, cd_offset, 0))
+
+
+class _PakketSchrijver(PackageWriter):
+    """PackageWriter van python-pptx, maar met onze ZIP-schrijver als fysieke laag."""
+
+    def __init__(self, zip_schrijver: _ZipSchrijver, pkg_rels, parts):
+        super().__init__(None, pkg_rels, parts)
+        self._zip = zip_schrijver
+
+    def _write(self) -> None:
+        self._write_content_types_stream(self._zip)
+        self._write_pkg_rels(self._zip)
+        self._write_parts(self._zip)
+        self._zip.sluit()
+
+
+def sla_pakket_op(prs, bestand, bron: bytes | None = None, bron_index: dict[str, BronLid] | None = None) -> dict[str, int]:
+    """
+    Sla `prs` op in `bestand` (pad of bestandsobject), met `bron` (de sjabloonbytes)
+    als bron voor ongewijzigde leden. Geeft het aantal gekopieerde, opgeslagen en
+    gedeflate leden terug.
+    """
+    if bron is not None and bron_index is None:
+        bron_index = indexeer_zip(bron)
+    if isinstance(bestand, (str, os.PathLike)):
+        with open(bestand, "wb") as f:
+            return sla_pakket_op(prs, f, bron, bron_index)
+
+    start = bestand.tell()
+    package = prs.part.package
+    schrijver = _ZipSchrijver(bestand, bron, bron_index)
+    try:
+        _PakketSchrijver(schrijver, package._rels, tuple(package.iter_parts()))._write()
+    except _ZipTeGroot:
+        if not bestand.seekable():
+            raise ValueError("Pakket groter dan 4 GB kan niet als stroom worden geschreven (zip64)")
+        # Groter dan 4 GB: python-pptx (zipfile) kan zip64
+        bestand.seek(start)
+        bestand.truncate()
+        prs.save(bestand)
+        return {}
+    return schrijver.telling
@@ -0,0 +1,268 @@
+# scripts/opslag.py
+# -*- coding: utf-8 -*-
+"""
+Warme Uitvaartassistent — Opslaglaag met langlevende clients voor GCS, R2/S3 en lokale schijf
+
+Kies de backend met STORAGE_BACKEND=gcs|r2|local (standaard gcs). Clients worden
+één keer per proces aangemaakt en hergebruikt; grote uploads gaan in delen en
+parallel; tijdelijke (presigned) links worden gecachet tot kort voor ze verlopen.
+De lokale backend maakt het mogelijk de hele service offline te draaien.
+"""
+
+import io
+import os
+import time
+import uuid
+import shutil
+import threading
+from typing import NamedTuple
+
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "gcs")
+MULTIPART_DREMPEL = int(os.getenv("STORAGE_MULTIPART_THRESHOLD", str(16 * 1024 * 1024)))
+MULTIPART_DEELGROOTTE = int(os.getenv("STORAGE_CHUNK_SIZE", str(8 * 1024 * 1024)))
+UPLOAD_WORKERS = int(os.getenv("STORAGE_UPLOAD_WORKERS", "8"))
+PPTX_CONTENT_TYPE = "application/vnd.openxmlformats-officedocument.presentationml.presentation"
+
+
+class ObjectMeta(NamedTuple):
+    generation: int
+    size: int
+
+
+class Opslag:
+    """Gemeenschappelijke basis: cache voor tijdelijke links."""
+
+    naam = "basis"
+
+    def __init__(self):
+        self._url_lock = threading.Lock()
+        self._url_cache: dict[tuple[str, str, int], tuple[str, float]] = {}
+
+    # -- te implementeren per backend --
+    def metadata(self, bucket: str, sleutel: str) -> ObjectMeta | None:
+        raise NotImplementedError
+
+    def download_naar_bestand(self, bucket: str, sleutel: str, pad: str, generation: int | None = None) -> None:
+        raise NotImplementedError
+
+    def upload_bytes(self, bucket: str, sleutel: str, data: bytes, content_type: str = PPTX_CONTENT_TYPE) -> None:
+        raise NotImplementedError
+
+    def upload_bestand(self, bucket: str, sleutel: str, pad: str, content_type: str = PPTX_CONTENT_TYPE) -> None:
+        raise NotImplementedError
+
+    def _maak_tijdelijke_url(self, bucket: str, sleutel: str, seconden: int) -> str:
+        raise NotImplementedError
+
+    def download_url(self, bucket: str, sleutel: str) -> str:
+        """Link die aan de klant wordt teruggegeven."""
+        return self.tijdelijke_url(bucket, sleutel)
+
+    # -- gedeeld --
+    def tijdelijke_url(self, bucket: str, sleutel: str, seconden: int = 86400) -> str:
+        """Presigned link, gecachet tot 80% van de geldigheidsduur verstreken is."""
+        cache_sleutel = (bucket, sleutel, seconden)
+        nu = time.time()
+        with self._url_lock:
+            hit = self._url_cache.get(cache_sleutel)
+            if hit and hit[1] > nu:
+                return hit[0]
+        url = self._maak_tijdelijke_url(bucket, sleutel, seconden)
+        with self._url_lock:
+            self._url_cache[cache_sleutel] = (url, nu + seconden * 0.8)
+        return url
+
+
+# ---------------------------
+# Google Cloud Storage
+# ---------------------------
+
+class GCSOpslag(Opslag):
+    naam = "gcs"
+
+    def __init__(self):
+        super().__init__()
+        from google.cloud import storage
+        self.client = storage.Client()
+
+    def metadata(self, bucket, sleutel):
+        blob = self.client.bucket(bucket).get_blob(sleutel)
+        if blob is None:
+            return None
+        return ObjectMeta(int(blob.generation), int(blob.size or 0))
+
+    def download_naar_bestand(self, bucket, sleutel, pad, generation=None):
+        self.client.bucket(bucket).blob(sleutel, generation=generation).download_to_filename(pad)
+
+    def upload_bytes(self, bucket, sleutel, data, content_type=PPTX_CONTENT_TYPE):
+        blob = self.client.bucket(bucket).blob(sleutel)
+        if len(data) > MULTIPART_DREMPEL:
+            # Resumable upload in delen i.p.v. één grote request
+            blob.chunk_size = MULTIPART_DEELGROOTTE
+            blob.upload_from_file(io.BytesIO(data), size=len(data), content_type=content_type)
+        else:
+            blob.upload_from_string(data, content_type=content_type)
+
+    def upload_bestand(self, bucket, sleutel, pad, content_type=PPTX_CONTENT_TYPE):
+        blob = self.client.bucket(bucket).blob(sleutel)
+        if os.path.getsize(pad) > MULTIPART_DREMPEL:
+            from google.cloud.storage import transfer_manager
+            blob.content_type = content_type
+            # Threads i.p.v. de standaard procespool: het werk is I/O, en geen fork in de API-worker
+            transfer_manager.upload_chunks_concurrently(
+                pad, blob, chunk_size=MULTIPART_DEELGROOTTE, max_workers=UPLOAD_WORKERS,
+                worker_type=transfer_manager.THREAD,
+            )
+        else:
+            blob.upload_from_filename(pad, content_type=content_type)
+
+    def download_url(self, bucket, sleutel):
+        return f"https://storage.googleapis.com/{bucket}/{sleutel}"
+
+    def _maak_tijdelijke_url(self, bucket, sleutel, seconden):
+        from datetime import timedelta
+        blob = self.client.bucket(bucket).blob(sleutel)
+        return blob.generate_signed_url(expiration=timedelta(seconds=seconden), version="v4")
+
+
+# ---------------------------
+# Cloudflare R2 / S3
+# ---------------------------
+
+class R2Opslag(Opslag):
+    naam = "r2"
+
+    def __init__(self):
+        super().__init__()
+        import boto3
+        from botocore.config import Config
+        from boto3.s3.transfer import TransferConfig
+
+        session = boto3.session.Session()
+        self.client = session.client(
+            "s3",
+            endpoint_url=os.getenv("R2_ENDPOINT"),
+            aws_access_key_id=os.getenv("R2_ACCESS_KEY"),
+            aws_secret_access_key=os.getenv("R2_SECRET_KEY"),
+            region_name=os.getenv("R2_REGION") or None,
+            config=Config(max_pool_connections=max(10, UPLOAD_WORKERS * 2)),
+        )
+        self.transfer_config = TransferConfig(
+            multipart_threshold=MULTIPART_DREMPEL,
+            multipart_chunksize=MULTIPART_DEELGROOTTE,
+            max_concurrency=UPLOAD_WORKERS,
+        )
+        self.standaard_bucket = os.getenv("R2_BUCKET")
+
+    def _bucket(self, bucket):
+        return bucket or self.standaard_bucket
+
+    def metadata(self, bucket, sleutel):
+        from botocore.exceptions import ClientError
+        try:
+            head = self.client.head_object(Bucket=self._bucket(bucket), Key=sleutel)
+        except ClientError:
+            return None
+        # R2/S3 kent geen generation; de ETag is een stabiele versie-aanduiding
+        return ObjectMeta(int(head["ETag"].strip('"').split("-")[0], 16), int(head["ContentLength"]))
+
+    def download_naar_bestand(self, bucket, sleutel, pad, generation=None):
+        self.client.download_file(self._bucket(bucket), sleutel, pad, Config=self.transfer_config)
+
+    def upload_bytes(self, bucket, sleutel, data, content_type=PPTX_CONTENT_TYPE):
+        self.client.upload_fileobj(
+            io.BytesIO(data), self._bucket(bucket), sleutel,
+            ExtraArgs={"ContentType": content_type}, Config=self.transfer_config,
+        )
+
+    def upload_bestand(self, bucket, sleutel, pad, content_type=PPTX_CONTENT_TYPE):
+        self.client.upload_file(
+            pad, self._bucket(bucket), sleutel,
+            ExtraArgs={"ContentType": content_type}, Config=self.transfer_config,
+        )
+
+    def _maak_tijdelijke_url(self, bucket, sleutel, seconden):
+        return self.client.generate_presigned_url(
+            ClientMethod="get_object",
+            Params={"Bucket": self._bucket(bucket), "Key": sleutel},
+            ExpiresIn=seconden,
+        )
+
+
+# ---------------------------
+# Lokale schijf (offline, tests en benchmarks)
+# ---------------------------
+
+class LokaleOpslag(Opslag):
+    naam = "local"
+
+    def __init__(self, root: str | None = None):
+        super().__init__()
+        self.root = root or os.getenv("LOCAL_STORAGE_DIR", "/tmp/uitvaart-opslag")
+        self.basis_url = os.getenv("LOCAL_STORAGE_BASE_URL")
+
+    def _pad(self, bucket, sleutel):
+        pad = os.path.realpath(os.path.join(self.root, bucket or "", sleutel))
+        if not pad.startswith(os.path.realpath(self.root) + os.sep):
+            raise ValueError(f"Ongeldige sleutel: {sleutel}")
+        return pad
+
+    def metadata(self, bucket, sleutel):
+        try:
+            st = os.stat(self._pad(bucket, sleutel))
+        except FileNotFoundError:
+            return None
+        return ObjectMeta(st.st_mtime_ns, st.st_size)
+
+    def download_naar_bestand(self, bucket, sleutel, pad, generation=None):
+        shutil.copyfile(self._pad(bucket, sleutel), pad)
+
+    def upload_bytes(self, bucket, sleutel, data, content_type=PPTX_CONTENT_TYPE):
+        doel = self._pad(bucket, sleutel)
+        os.makedirs(os.path.dirname(doel), exist_ok=True)
+        tmp = f"{doel}.{uuid.uuid4().hex}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, doel)
+
+    def upload_bestand(self, bucket, sleutel, pad, content_type=PPTX_CONTENT_TYPE):
+        doel = self._pad(bucket, sleutel)
+        os.makedirs(os.path.dirname(doel), exist_ok=True)
+        tmp = f"{doel}.{uuid.uuid4().hex}.tmp"
+        shutil.copyfile(pad, tmp)
+        os.replace(tmp, doel)
+
+    def download_url(self, bucket, sleutel):
+        if self.basis_url:
+            return f"{self.basis_url.rstrip('/')}/{bucket}/{sleutel}"
+        return "file://" + self._pad(bucket, sleutel)
+
+    def _maak_tijdelijke_url(self, bucket, sleutel, seconden):
+        return self.download_url(bucket, sleutel)
+
+
+# ---------------------------
+# Keuze van de backend (één instantie per proces)
+# ---------------------------
+
+_BACKENDS = {"gcs": GCSOpslag, "r2": R2Opslag, "local": LokaleOpslag}
+_instanties: dict[str, Opslag] = {}
+_instanties_lock = threading.Lock()
+
+
+def get_opslag(naam: str | None = None) -> Opslag:
+    """Geef de (gedeelde) opslagbackend; standaard volgens STORAGE_BACKEND."""
+    naam = (naam or STORAGE_BACKEND).lower()
+    with _instanties_lock:
+        if naam not in _instanties:
+            if naam not in _BACKENDS:
+                raise ValueError(f"Onbekende opslagbackend: {naam}")
+            _instanties[naam] = _BACKENDS[naam]()
+        return _instanties[naam]
+
+
+def zet_opslag(opslag: Opslag, naam: str | None = None) -> None:
+    """Vervang een backend (bijv. een nep-backend in een benchmark of loadtest)."""
+    with _instanties_lock:
+        _instanties[(naam or STORAGE_BACKEND).lower()] = opslag
@@ -0,0 +1,80 @@
+# scripts/profilering.py
+# -*- coding: utf-8 -*-
+"""
+Warme Uitvaartassistent — Profiel van één run op verzoek (cProfile)
+
+Alleen actief als erom gevraagd wordt; zonder profiel loopt de code ongewijzigd.
+De dump is een standaard pstats-bestand: te bekijken met `python -m pstats`,
+snakeviz of flameprof (flame graph).
+"""
+
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# cProfile kan niet in meerdere threads tegelijk actief zijn; één profiel per proces
+_lock = threading.Lock()
+# Binnen een geprofileerde run: foto's in-process voorbereiden, anders ziet het profiel alleen wachttijd
+_actief: ContextVar[bool] = ContextVar("profiel_actief", default=False)
+
+
+class ProfielBezet(RuntimeError):
+    """Er loopt al een geprofileerde run in dit proces."""
+
+
+class Profiel:
+    """Resultaat van een geprofileerde run."""
+
+    def __init__(self):
+        self._profiler = cProfile.Profile()
+        self._stats: pstats.Stats | None = None
+
+    @property
+    def stats(self) -> pstats.Stats:
+        if self._stats is None:
+            self._stats = pstats.Stats(self._profiler)
+        return self._stats
+
+    def als_bytes(self) -> bytes:
+        """De pstats-dump (zelfde formaat als `Stats.dump_stats`)."""
+        return marshal.dumps(self.stats.stats)
+
+    def schrijf(self, pad: str) -> str:
+        self.stats.dump_stats(pad)
+        return pad
+
+    def samenvatting(self, aantal: int = 25, sorteer: str = "cumulative") -> str:
+        """Top-N functies als tekst, voor direct in een antwoord of log."""
+        buf = io.StringIO()
+        pstats.Stats(self._profiler, stream=buf).sort_stats(sorteer).print_stats(aantal)
+        return buf.getvalue()
+
+
+@contextmanager
+def profileer():
+    """
+    Profileer het blok in de huidige thread. Werk in andere threads telt alleen
+    als wachttijd mee; foto's worden in deze run in-process voorbereid (zie profiel_actief).
+    """
+    if not _lock.acquire(blocking=False):
+        raise ProfielBezet("Er loopt al een geprofileerde run in dit proces")
+    profiel = Profiel()
+    token = _actief.set(True)
+    try:
+        profiel._profiler.enable()
+        try:
+            yield profiel
+        finally:
+            profiel._profiler.disable()
+    finally:
+        _actief.reset(token)
+        _lock.release()
+
+
+def profiel_actief() -> bool:
+    """True binnen een geprofileerde run (in deze context)."""
+    return _actief.get()
@@ -1,23 +1,19 @@
-import boto3, os
+import os
 from dotenv import load_dotenv
 
+from scripts.opslag import get_opslag
+
 # .env-bestand laden (zorgt dat sleutels uit .env gelezen worden)
 load_dotenv()
 
-# Verbinding maken met Cloudflare R2
-session = boto3.session.Session()
-s3 = session.client(
-    's3',
-    endpoint_url=os.getenv("R2_ENDPOINT"),
-    aws_access_key_id=os.getenv("R2_ACCESS_KEY"),
-    aws_secret_access_key=os.getenv("R2_SECRET_KEY")
-)
+# De boto3-client wordt één keer per proces aangemaakt in scripts/opslag.py
+# (met connection pool en parallelle multipart-uploads voor grote bestanden).
 
 def upload_bestand(file_path, doel_pad):
     """Upload een bestand naar de R2 bucket."""
     try:
         bucket = os.getenv("R2_BUCKET")
-        s3.upload_file(file_path, bucket, doel_pad)
+        get_opslag("r2").upload_bestand(bucket, doel_pad, file_path)
         print(f"✅ Bestand geüpload naar R2: {doel_pad}")
     except Exception as e:
         print("❌ Er ging iets mis bij het uploaden:", e)
@@ -26,12 +22,7 @@ def maak_tijdelijke_downloadlink(doel_pad, seconden=86400):
     """Maak een tijdelijke downloadlink (24 uur geldig)."""
     try:
         bucket = os.getenv("R2_BUCKET")
-        url = s3.generate_presigned_url(
-            ClientMethod='get_object',
-            Params={'Bucket': bucket, 'Key': doel_pad},
-            ExpiresIn=seconden
-        )
-        return url
+        return get_opslag("r2").tijdelijke_url(bucket, doel_pad, seconden)
     except Exception as e:
         print("❌ Er ging iets mis bij het genereren van de link:", e)
         return None
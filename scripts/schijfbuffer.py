@@ -0,0 +1,219 @@
+# scripts/schijfbuffer.py
+# -*- coding: utf-8 -*-
+"""
+Warme Uitvaartassistent — Foto's en presentaties boven een drempel naar schijf
+
+- FotoBuffer houdt per request fotobytes in het geheugen tot SPILL_PHOTO_BYTES;
+  daarboven gaat elke foto naar een tijdelijk bestand (GespildeFoto). De
+  procespool krijgt dan alleen het pad mee en leest het bestand zelf.
+- FotoSpool ontvangt één foto in stukken (upload); boven zijn drempel schrijft hij
+  naar een tijdelijk bestand dat zelf de GespildeFoto wordt, zonder tweede kopie.
+- UitvoerBuffer is een BytesIO die boven SPILL_OUTPUT_BYTES overstapt op een
+  tijdelijk bestand, zodat een groot .pptx niet in zijn geheel in het geheugen staat.
+
+Let op: op platforms waar /tmp in het geheugen staat (tmpfs) levert dit niets op;
+zet SPILL_DIR dan op een echte schijf.
+"""
+
+import hashlib
+import io
+import os
+import tempfile
+import threading
+import weakref
+
+
+SPILL_DIR = os.getenv("SPILL_DIR") or None
+SPILL_PHOTO_BYTES = int(os.getenv("SPILL_PHOTO_BYTES", str(64 * 1024 * 1024)))
+SPILL_OUTPUT_BYTES = int(os.getenv("SPILL_OUTPUT_BYTES", str(32 * 1024 * 1024)))
+
+
+def _verwijder(pad: str) -> None:
+    try:
+        os.unlink(pad)
+    except FileNotFoundError:
+        pass
+
+
+class GespildeFoto:
+    """
+    Fotobytes in een tijdelijk bestand. Het bestand verdwijnt met de laatste verwijzing
+    in het proces dat het schreef; kopieën in de procespool ruimen niets op.
+    """
+
+    __slots__ = ("pad", "grootte", "sha1", "_opruimen", "__weakref__")
+
+    def __init__(self, pad: str, grootte: int, sha1: str, eigenaar: bool = True):
+        self.pad = pad
+        self.grootte = grootte
+        self.sha1 = sha1
+        self._opruimen = weakref.finalize(self, _verwijder, pad) if eigenaar else None
+
+    @classmethod
+    def schrijf(cls, data: bytes) -> "GespildeFoto":
+        fd, pad = tempfile.mkstemp(prefix="foto-", dir=SPILL_DIR)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        return cls(pad, len(data), hashlib.sha1(data).hexdigest())
+
+    def lees(self) -> bytes:
+        with open(self.pad, "rb") as f:
+            return f.read()
+
+    def __len__(self) -> int:
+        return self.grootte
+
+    def __reduce__(self):
+        return (GespildeFoto, (self.pad, self.grootte, self.sha1, False))
+
+
+def foto_bytes(data: "bytes | GespildeFoto") -> bytes:
+    """De bytes van een foto, ook als hij naar schijf is gegaan."""
+    return data.lees() if isinstance(data, GespildeFoto) else data
+
+
+def foto_sha1(data: "bytes | GespildeFoto") -> str:
+    return data.sha1 if isinstance(data, GespildeFoto) else hashlib.sha1(data).hexdigest()
+
+
+class FotoBuffer:
+    """Fotobytes van één request: in het geheugen tot de drempel, daarna op schijf."""
+
+    def __init__(self, drempel: int = SPILL_PHOTO_BYTES):
+        self.drempel = drempel
+        self.in_geheugen = 0
+        self.gespild = 0
+        self._lock = threading.Lock()
+
+    def bewaar(self, data: "bytes | GespildeFoto") -> "bytes | GespildeFoto":
+        if isinstance(data, GespildeFoto):
+            # Al op schijf (bijv. uit een FotoSpool): alleen meetellen
+            with self._lock:
+                self.gespild += 1
+            return data
+        with self._lock:
+            if self.in_geheugen + len(data) <= self.drempel:
+                self.in_geheugen += len(data)
+                return data
+            self.gespild += 1
+        return GespildeFoto.schrijf(data)
+
+
+class FotoSpool:
+    """Eén binnenkomende foto: in het geheugen tot de drempel, daarna in een tijdelijk bestand."""
+
+    def __init__(self, drempel: int):
+        self.drempel = drempel
+        self.grootte = 0
+        self.kop = b""
+        self._data = bytearray()
+        self._f = None
+        self._pad: str | None = None
+        self._sha1 = None
+
+    @property
+    def op_schijf(self) -> bool:
+        return self._f is not None
+
+    def write(self, data: bytes) -> None:
+        if len(self.kop) < 8:
+            self.kop += data[:8 - len(self.kop)]
+        self.grootte += len(data)
+        if self._f is None and len(self._data) + len(data) > self.drempel:
+            fd, self._pad = tempfile.mkstemp(prefix="foto-", dir=SPILL_DIR)
+            self._f = os.fdopen(fd, "wb")
+            self._f.write(self._data)
+            # De sha1 meteen bijhouden, zodat het bestand niet nog eens gelezen hoeft te worden
+            self._sha1 = hashlib.sha1(self._data)
+            self._data = bytearray()
+        if self._f is None:
+            self._data += data
+        else:
+            self._f.write(data)
+            self._sha1.update(data)
+
+    def neem(self) -> "bytes | GespildeFoto":
+        """De foto; een tijdelijk bestand gaat over naar de GespildeFoto (die ruimt het op)."""
+        if self._f is None:
+            data, self._data = bytes(self._data), bytearray()
+            return data
+        self._f.close()
+        self._f = None
+        foto = GespildeFoto(self._pad, self.grootte, self._sha1.hexdigest())
+        self._pad = None
+        return foto
+
+    def close(self) -> None:
+        """Opruimen als de foto niet is overgenomen (fout, of geen JPEG/PNG)."""
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+        if self._pad is not None:
+            _verwijder(self._pad)
+            self._pad = None
+        self._data = bytearray()
+
+
+class UitvoerBuffer(io.RawIOBase):
+    """Schrijfbuffer in het geheugen die boven de drempel naar een tijdelijk bestand overstapt."""
+
+    def __init__(self, drempel: int = SPILL_OUTPUT_BYTES):
+        super().__init__()
+        self.drempel = drempel
+        self._f = io.BytesIO()
+        self.pad: str | None = None
+
+    @property
+    def op_schijf(self) -> bool:
+        return self.pad is not None
+
+    def _naar_schijf(self) -> None:
+        fd, self.pad = tempfile.mkstemp(prefix="deck-", suffix=".pptx", dir=SPILL_DIR)
+        bestand = os.fdopen(fd, "w+b")
+        positie = self._f.tell()
+        bestand.write(self._f.getbuffer())
+        bestand.seek(positie)
+        self._f.close()
+        self._f = bestand
+
+    def writable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        if self.pad is None and self._f.tell() + len(data) > self.drempel:
+            self._naar_schijf()
+        return self._f.write(data)
+
+    def tell(self) -> int:
+        return self._f.tell()
+
+    def flush(self) -> None:
+        self._f.flush()
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        return self._f.seek(offset, whence)
+
+    def truncate(self, size: int | None = None) -> int:
+        return self._f.truncate(size)
+
+    def grootte(self) -> int:
+        return self._f.seek(0, io.SEEK_END)
+
+    def getvalue(self) -> bytes:
+        """Alle bytes (alleen voor kleine buffers; gebruik anders `pad`)."""
+        if self.pad is None:
+            return self._f.getvalue()
+        self.flush()
+        with open(self.pad, "rb") as f:
+            return f.read()
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        super().close()  # roept flush() nog aan
+        self._f.close()
+        if self.pad is not None:
+            _verwijder(self.pad)
@@ -0,0 +1,120 @@
+# scripts/zip_invoer.py
+# -*- coding: utf-8 -*-
+"""
+Warme Uitvaartassistent — Foto's rechtstreeks uit ZIP-archieven lezen
+
+In plaats van `extractall` naar een tijdelijke map: alleen de fotoleden worden
+gelezen (op extensie en magic bytes), parallel uitgepakt, met een plafond op de
+totale uitgepakte grootte. De volgorde is vast: per archief op natuurlijke
+naamvolgorde (foto_2 vóór foto_10). Met `verwerk` (bijv. FotoBuffer.bewaar) gaat
+elke foto direct na het lezen naar schijf zodra de buffer vol is, zodat een groot
+archief niet in zijn geheel in het geheugen komt.
+"""
+
+import os
+import re
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+
+FOTO_EXTENSIES = (".jpg", ".jpeg", ".png")
+MAX_TOTAAL_BYTES = int(os.getenv("ZIP_MAX_TOTAL_BYTES", str(1024 * 1024 * 1024)))
+MAX_FOTO_BYTES = int(os.getenv("ZIP_MAX_PHOTO_BYTES", str(64 * 1024 * 1024)))
+ZIP_WORKERS = int(os.getenv("ZIP_READ_WORKERS", "4"))
+LEESBLOK = 1024 * 1024
+
+_MAGIC = (b"\xff\xd8\xff", b"\x89PNG\r\n\x1a\n")
+
+
+def is_foto_data(data: bytes) -> bool:
+    """JPEG of PNG op basis van de eerste bytes."""
+    return data.startswith(_MAGIC)
+
+
+def _natuurlijke_sleutel(naam: str) -> list:
+    return [int(d) if d.isdigit() else d.lower() for d in re.split(r"(\d+)", naam)]
+
+
+def _is_kandidaat(info: zipfile.ZipInfo) -> bool:
+    if info.is_dir():
+        return False
+    naam = info.filename
+    basis = naam.rsplit("/", 1)[-1]
+    # macOS-metadata (__MACOSX/, ._foto.jpg) en verborgen bestanden overslaan
+    if naam.startswith("__MACOSX/") or basis.startswith("."):
+        return False
+    return basis.lower().endswith(FOTO_EXTENSIES)
+
+
+def fotoleden(zf: zipfile.ZipFile) -> list[zipfile.ZipInfo]:
+    """De fotoleden van een archief, in vaste volgorde; andere bestanden worden niet gelezen."""
+    leden = [info for info in zf.infolist() if _is_kandidaat(info) and 0 < info.file_size <= MAX_FOTO_BYTES]
+    return sorted(leden, key=lambda info: _natuurlijke_sleutel(info.filename))
+
+
+def _lees_lid(zf: zipfile.ZipFile, info: zipfile.ZipInfo) -> bytes | None:
+    """Lees één lid; None als het geen foto is of groter blijkt dan opgegeven."""
+    with zf.open(info) as f:
+        kop = f.read(8)
+        if not is_foto_data(kop):
+            return None
+        delen = [kop]
+        gelezen = len(kop)
+        while True:
+            blok = f.read(LEESBLOK)
+            if not blok:
+                break
+            gelezen += len(blok)
+            # De centrale directory kan liegen (zip-bom): nooit meer lezen dan opgegeven
+            if gelezen > info.file_size:
+                return None
+            delen.append(blok)
+    return b"".join(delen)
+
+
+def lees_fotos_uit_zips(
+    zip_paden: list[str],
+    max_totaal_bytes: int = MAX_TOTAAL_BYTES,
+    max_workers: int | None = None,
+    verwerk=None,
+) -> list[tuple[str, bytes]]:
+    """
+    Lees alle foto's uit de archieven zonder uit te pakken naar schijf.
+    Geeft (naam, bytes) in vaste volgorde; naam is '<archief>!<lid>'.
+    verwerk: optioneel, draait in dezelfde thread op de bytes van elke gelezen foto;
+    het resultaat komt dan in plaats van de bytes.
+    """
+    archieven = []
+    try:
+        werk = []
+        totaal = 0
+        for zip_pad in zip_paden:
+            zf = zipfile.ZipFile(zip_pad, "r")
+            archieven.append(zf)
+            for info in fotoleden(zf):
+                totaal += info.file_size
+                if totaal > max_totaal_bytes:
+                    raise ValueError(
+                        f"Foto's in de ZIP-bestanden zijn samen groter dan {max_totaal_bytes // (1024 * 1024)} MB."
+                    )
+                werk.append((zf, info, f"{os.path.basename(zip_pad)}!{info.filename}"))
+
+        def _lees(w):
+            data = _lees_lid(w[0], w[1])
+            return verwerk(data) if verwerk is not None and data is not None else data
+
+        # zlib geeft de GIL vrij tijdens het uitpakken: threads lezen echt parallel
+        workers = max(1, min(max_workers or ZIP_WORKERS, len(werk) or 1))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="zip-lezen") as pool:
+            resultaten = list(pool.map(_lees, werk))
+
+        fotos = []
+        for (_, info, naam), data in zip(werk, resultaten):
+            if data is None:
+                print(f"⚠️ Overgeslagen (geen geldige foto): {info.filename}")
+                continue
+            fotos.append((naam, data))
+        return fotos
+    finally:
+        for zf in archieven:
+            zf.close()
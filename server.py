@@ -1,32 +1,77 @@
-from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
-from fastapi.responses import JSONResponse
+import os
+import uuid
+from fastapi import FastAPI, HTTPException, Header
+from pydantic import BaseModel, validator
+from fastapi.responses import FileResponse, JSONResponse
+from starlette.background import BackgroundTask
 from scripts.maak_presentatie import maak_presentatie_automatisch
+from api.jobs import router as jobs_router, submit_job
+from api.profiling import profile_requested
+from scripts.profilering import ProfielBezet
+from scripts.opslag import PPTX_CONTENT_TYPE
 
 class PresentatieRequest(BaseModel):
     naam: str
     fotos: list
     sjabloon: str
     datums: str | None = None
+    async_job: bool = False
+    callback_url: str | None = None
+    # ✅ Het .pptx-bestand zelf als response i.p.v. een pad op deze server
+    stream: bool = False
+
+    @validator("stream")
+    def stream_not_async(cls, v, values):
+        if v and values.get("async_job"):
+            raise ValueError("stream kan niet samen met async_job")
+        return v
 
 app = FastAPI()
+app.include_router(jobs_router)
+
+def _maak(req: PresentatieRequest, profiel: bool = False) -> dict:
+    # Eigen bestandsnaam per build: jobs en requests lopen gelijktijdig
+    resultaat_pad = maak_presentatie_automatisch(
+        sjabloon_pad=req.sjabloon,
+        uitvoer_pad=f"{uuid.uuid4().hex[:8]}_presentatie.pptx",
+        base44_foto_urls=req.fotos,
+        titel_naam=req.naam,
+        titel_datums=req.datums,
+        ratio_mode="cover",
+        repeat_if_insufficient=True,
+        profiel=profiel,
+    )
+    return {
+        "status": "success",
+        "download_url": resultaat_pad
+    }
 
+# Gewone def: FastAPI draait dit in de threadpool, zodat de event loop vrij blijft
 @app.post("/generate")
-async def generate_presentation(req: PresentatieRequest):
+def generate_presentation(req: PresentatieRequest, x_profile: str | None = Header(None), x_api_key: str | None = Header(None)):
+    profiel = profile_requested(x_profile, x_api_key)
+    if req.async_job:
+        job = submit_job(lambda: _maak(req, profiel), callback_url=req.callback_url)
+        return JSONResponse(status_code=202, content=job.as_dict())
+
     try:
-        resultaat_pad = maak_presentatie_automatisch(
-            sjabloon_pad=req.sjabloon,
-            base44_foto_urls=req.fotos,
-            titel_naam=req.naam,
-            titel_datums=req.datums,
-            ratio_mode="cover",
-            repeat_if_insufficient=True
-        )
-
-        return JSONResponse(content={
-            "status": "success",
-            "download_url": resultaat_pad
-        })
+        resultaat = _maak(req, profiel)
 
+    except ProfielBezet as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+    if req.stream:
+        return _als_bestand(resultaat["download_url"])
+    return JSONResponse(content=resultaat)
+
+
+def _als_bestand(pad: str) -> FileResponse:
+    """Stuur het deck in stukken naar de client en ruim het daarna op."""
+    return FileResponse(
+        pad,
+        media_type=PPTX_CONTENT_TYPE,
+        filename=os.path.basename(pad),
+        background=BackgroundTask(os.remove, pad),
+    )